@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from datetime import date
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from . import models, market_depth
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Rows moved per transaction, so the writer lock is never held for long
+ARCHIVE_BATCH_SIZE = 500
+
+# How often the background archiver runs
+ARCHIVE_INTERVAL_SECONDS = 60 * 60
+
+# Live table -> archive table
+# transactions.ticket_id has no foreign key to tickets (see
+# migrations.drop_transaction_ticket_fk), so archiving a ticket leaves its
+# transactions in place on every backend.
+ARCHIVED_MODELS = [
+    (models.Ticket, models.TicketArchive),
+    (models.SellListing, models.SellListingArchive),
+    (models.BuyRequest, models.BuyRequestArchive),
+]
+
+
+def upcoming(model, today: date = None):
+    """Filter for rows whose event hasn't happened yet."""
+    return model.event_date >= (today or date.today())
+
+
+def archive_batch(db: Session, live, archived, today: date, batch_size: int = ARCHIVE_BATCH_SIZE):
+    """Move one batch of past-event rows from `live` to `archived` and commit.
+
+    Returns the number of rows moved.
+    """
+    live_table = live.__table__
+    archive_table = archived.__table__
+    primary_key = live_table.primary_key.columns.values()[0]
+
+    # Skip ids the archive already has (reused before ids were AUTOINCREMENT)
+    # so one clash can't stall archiving; run_migrations logs them
+    archived_ids = select(archive_table.c[primary_key.name])
+    ids = db.execute(
+        select(primary_key)
+        .where(live.event_date < today, primary_key.not_in(archived_ids))
+        .order_by(primary_key)
+        .limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    # Copy the columns both tables share; archived_date fills in from its default
+    columns = [column.name for column in archive_table.columns if column.name in live_table.columns]
+    db.execute(
+        insert(archive_table).from_select(
+            columns,
+            select(*[live_table.c[name] for name in columns]).where(primary_key.in_(ids))
+        )
+    )
+    db.execute(delete(live_table).where(primary_key.in_(ids)))
+    db.commit()
+    return len(ids)
+
+
+def archive_past_events(db: Session, today: date = None, batch_size: int = ARCHIVE_BATCH_SIZE):
+    """Archive every row for past events, one batch per transaction."""
+    today = today or date.today()
+    moved = {}
+    for live, archived in ARCHIVED_MODELS:
+        total = 0
+        while True:
+            count = archive_batch(db, live, archived, today, batch_size)
+            total += count
+            if count < batch_size:
+                break
+        moved[live.__tablename__] = total
+    market_depth.drop_past_events(db, today)
+    db.commit()
+    return moved
+
+
+def _archive_once():
+    db = SessionLocal()
+    try:
+        moved = archive_past_events(db)
+        if any(moved.values()):
+            logger.info(f"Archived past-event rows: {moved}")
+    finally:
+        db.close()
+
+
+async def archive_periodically():
+    """Background loop that keeps the live tables free of past events."""
+    while True:
+        try:
+            await run_in_threadpool(_archive_once)
+        except Exception:
+            logger.exception("Archiving past events failed")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
@@ -1,5 +1,4 @@
 import logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 from datetime import datetime, timedelta
@@ -0,0 +1,26 @@
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session
+from . import models
+
+
+def fulfilled_clause(exclude_ticket_ids=None):
+    """True when the buyer already bought a ticket to the event within their max price.
+
+    Tickets in `exclude_ticket_ids` don't count.
+    """
+    clause = exists().where(
+        models.Ticket.buyer_id == models.BuyRequest.buyer_id,
+        models.Ticket.event_id == models.BuyRequest.event_id,
+        models.Ticket.is_sold == True,
+        models.Ticket.price <= models.BuyRequest.max_price
+    )
+    if exclude_ticket_ids:
+        clause = clause.where(models.Ticket.ticket_id.not_in(exclude_ticket_ids))
+    return clause
+
+
+def is_fulfilled(db: Session, db_request: models.BuyRequest):
+    """Whether a flushed buy request is already fulfilled."""
+    return db.execute(
+        select(fulfilled_clause()).where(models.BuyRequest.request_id == db_request.request_id)
+    ).scalar()
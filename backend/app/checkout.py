@@ -0,0 +1,140 @@
+from collections import Counter, defaultdict
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from . import models, holds, market_depth, price_history
+from .buy_requests import fulfilled_clause
+
+
+def claim_tickets(db: Session, ticket_ids, buyer_id: int, now: datetime, held_only: bool = False):
+    """Atomically mark unsold tickets as sold to the buyer.
+
+    Like holds.hold_tickets, the checks live in the UPDATE's WHERE clause, so
+    a concurrent sale, hold or expiry between reading a ticket and claiming
+    it can't slip through. With `held_only` only seats the buyer currently
+    holds qualify; otherwise any seat nobody else holds does.
+    Returns the number of tickets claimed.
+    """
+    if held_only:
+        available = holds.held_by(buyer_id, now)
+    else:
+        available = holds.not_held(now) | (models.Ticket.held_by_id == buyer_id)
+    result = db.execute(
+        update(models.Ticket)
+        .where(
+            models.Ticket.ticket_id.in_(ticket_ids),
+            models.Ticket.is_sold == False,
+            available,
+        )
+        .values(buyer_id=buyer_id, is_sold=True, held_by_id=None, hold_expires_at=None)
+        .execution_options(synchronize_session="evaluate")
+    )
+    return result.rowcount
+
+
+def buy_ticket(db: Session, ticket_id: int, buyer_id: int):
+    """Check a ticket can be bought and sell it to the buyer, without committing"""
+    # Get the ticket
+    db_ticket = db.query(models.Ticket).filter(models.Ticket.ticket_id == ticket_id).first()
+    if db_ticket is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+
+    # Check if ticket is already sold
+    if db_ticket.is_sold:
+        raise HTTPException(status_code=400, detail="Ticket is already sold")
+
+    # Seats held by another buyer can't be bought until the hold expires
+    now = datetime.utcnow()
+    if db_ticket.hold_expires_at and db_ticket.hold_expires_at > now and db_ticket.held_by_id != buyer_id:
+        raise HTTPException(status_code=409, detail="Ticket is held by another buyer")
+
+    # Someone bought or held it since we looked
+    if not claim_tickets(db, [ticket_id], buyer_id, now):
+        db.refresh(db_ticket)
+        if db_ticket.is_sold:
+            raise HTTPException(status_code=400, detail="Ticket is already sold")
+        raise HTTPException(status_code=409, detail="Ticket is held by another buyer")
+
+    complete_sales(db, [db_ticket], buyer_id)
+    return db_ticket
+
+
+def confirm_holds(db: Session, buyer_id: int, ticket_ids=None):
+    """Buy the seats the buyer holds (optionally only `ticket_ids`), without committing"""
+    now = datetime.utcnow()
+    query = db.query(models.Ticket).filter(
+        models.Ticket.is_sold == False,
+        holds.held_by(buyer_id, now)
+    )
+    if ticket_ids:
+        query = query.filter(models.Ticket.ticket_id.in_(ticket_ids))
+    held = query.all()
+
+    if not held or (ticket_ids and len(held) < len(set(ticket_ids))):
+        raise HTTPException(status_code=409, detail="Hold expired or not found")
+
+    # Claim them only if every hold is still live; all or nothing, since the
+    # caller rolls back when this raises
+    if claim_tickets(db, [db_ticket.ticket_id for db_ticket in held], buyer_id, now, held_only=True) < len(held):
+        raise HTTPException(status_code=409, detail="Hold expired or not found")
+
+    complete_sales(db, held, buyer_id)
+    return held
+
+
+def complete_sales(db: Session, db_tickets, buyer_id: int):
+    """Record the transactions for tickets claimed with claim_tickets, without committing.
+
+    Market depth and price history get one update per event and price
+    rather than one per seat. Buy requests the purchase fulfills stop
+    counting as bids.
+    """
+    sold_at = datetime.utcnow()
+    db.add_all([
+        models.Transaction(
+            ticket_id=db_ticket.ticket_id,
+            seller_id=db_ticket.seller_id,
+            buyer_id=buyer_id,
+            price=db_ticket.price,
+            payment_method="Credit Card",  # Default payment method
+            transaction_date=sold_at
+        )
+        for db_ticket in db_tickets
+    ])
+
+    sold_per_level = Counter((db_ticket.event_id, db_ticket.price) for db_ticket in db_tickets)
+    for (event_id, price), count in sold_per_level.items():
+        market_depth.adjust(db, event_id, market_depth.ASK, price, -count)
+    _remove_fulfilled_bids(db, db_tickets, buyer_id)
+
+    prices_per_event = defaultdict(list)
+    for db_ticket in db_tickets:
+        prices_per_event[db_ticket.event_id].append(db_ticket.price)
+    for event_id, prices in prices_per_event.items():
+        price_history.record_sales(db, event_id, prices, sold_at)
+
+
+def _remove_fulfilled_bids(db: Session, db_tickets, buyer_id: int):
+    """Take the buyer's requests that these tickets just fulfilled out of the bid levels."""
+    cheapest = {}
+    for db_ticket in db_tickets:
+        if db_ticket.event_id is not None:
+            cheapest[db_ticket.event_id] = min(db_ticket.price, cheapest.get(db_ticket.event_id, db_ticket.price))
+    if not cheapest:
+        return
+
+    # Requests that weren't fulfilled before this purchase, by level
+    request = models.BuyRequest
+    levels = db.execute(
+        select(request.event_id, request.max_price, func.sum(request.quantity))
+        .where(
+            request.buyer_id == buyer_id,
+            request.event_id.in_(list(cheapest)),
+            ~fulfilled_clause([db_ticket.ticket_id for db_ticket in db_tickets])
+        )
+        .group_by(request.event_id, request.max_price)
+    ).all()
+    for event_id, max_price, quantity in levels:
+        if cheapest[event_id] <= max_price:
+            market_depth.adjust(db, event_id, market_depth.BID, max_price, -quantity)
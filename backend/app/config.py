@@ -0,0 +1,36 @@
+import os
+from dataclasses import dataclass, field
+from typing import List
+
+
+def _flag(name, default):
+    return os.getenv(name, default) == "1"
+
+
+@dataclass
+class Settings:
+    # Create tables and run migrations on startup. app.serve turns this off
+    # for workers because it has already done it once.
+    run_migrations: bool = True
+    # Start the hold sweeper, archiver, invalidation poller and group-commit writer
+    background_tasks: bool = True
+    # Connections opened per engine during warm-up
+    warm_connections: int = 2
+    # Market depth for this many of the busiest events is cached before ready
+    preload_order_books: int = 50
+    # Startup slower than this is logged as a warning
+    startup_budget_seconds: float = 2.0
+    log_level: str = "INFO"
+    cors_origins: List[str] = field(default_factory=lambda: ["*"])  # In production, replace with specific origins
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            run_migrations=not _flag("SKIP_MIGRATIONS", "0"),
+            background_tasks=_flag("BACKGROUND_TASKS", "1"),
+            warm_connections=int(os.getenv("WARM_CONNECTIONS", "2")),
+            preload_order_books=int(os.getenv("PRELOAD_ORDER_BOOKS", "50")),
+            startup_budget_seconds=float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0")),
+            log_level=os.getenv("LOG_LEVEL", "INFO"),
+            cors_origins=os.getenv("CORS_ORIGINS", "*").split(","),
+        )
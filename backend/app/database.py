@@ -1,22 +1,93 @@
-from sqlalchemy import create_engine
+import math
+import os
+import time
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# SQLite database URL
-SQLALCHEMY_DATABASE_URL = "sqlite:///./ticket_market.db"
+# Primary (read-write) database URL
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ticket_market.db")
 
-# Create the SQLAlchemy engine
+# Read replica URL, e.g. a Postgres hot standby. When unset on SQLite we open
+# the primary file through a read-only URI connection as a local stand-in.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+
+# After a user writes, their reads go to the primary for this many seconds so
+# they always see their own changes even if the replica lags
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+
+def _connect_args(url):
+    if url.startswith("sqlite"):
+        return {"check_same_thread": False}
+    return {}
+
+
+def _read_only_url(url):
+    if READ_DATABASE_URL:
+        return READ_DATABASE_URL
+    if url.startswith("sqlite:///") and ":memory:" not in url:
+        return f"sqlite:///file:{url[len('sqlite:///'):]}?mode=ro&uri=true"
+    return url
+
+
+# Create the SQLAlchemy engines
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args=_connect_args(SQLALCHEMY_DATABASE_URL)
 )
 
-# Create a SessionLocal class
+read_url = _read_only_url(SQLALCHEMY_DATABASE_URL)
+read_engine = engine if read_url == SQLALCHEMY_DATABASE_URL else create_engine(
+    read_url, connect_args=_connect_args(read_url)
+)
+
+
+@event.listens_for(engine, "connect")
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers in other worker processes run alongside the one writer
+    if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+
+# Create the session classes
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Create a Base class
 Base = declarative_base()
 
-# Dependency to get the database session
+# Cookie carrying the time of the caller's last write. It lives on the client
+# so read-your-writes holds whichever worker serves the next read. Clients
+# that can't send cookies cross-origin echo the header of the same name.
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+
+
+def record_write(response: Response):
+    """Stamp the response so the caller's next reads go to the primary."""
+    stamp = f"{time.time():.3f}"
+    response.set_cookie(
+        LAST_WRITE_COOKIE, stamp, max_age=max(1, math.ceil(READ_YOUR_WRITES_SECONDS)),
+        httponly=True, samesite="lax"
+    )
+    response.headers[LAST_WRITE_HEADER] = stamp
+
+
+def _wrote_recently(request: Request):
+    stamp = request.cookies.get(LAST_WRITE_COOKIE) or request.headers.get(LAST_WRITE_HEADER)
+    try:
+        age = time.time() - float(stamp)
+    except (TypeError, ValueError):
+        return False
+    # A stamp from the future is forged or from a skewed clock, not a recent write
+    return 0 <= age < READ_YOUR_WRITES_SECONDS
+
+
+# Dependency to get a read-write session on the primary
 def get_db():
     db = SessionLocal()
     try:
@@ -24,3 +95,12 @@ def get_db():
     finally:
         db.close()
 
+
+
+# Dependency to get a session for GET routes, served by the replica
+def get_read_db(request: Request):
+    db = SessionLocal() if _wrote_recently(request) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,35 @@
+from datetime import date
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models
+
+
+def get_or_create_event(db: Session, name: str, category: str, event_date: date):
+    """Return the event for a name and date, creating it on first use."""
+    db_event = db.query(models.Event).filter(
+        models.Event.name == name,
+        models.Event.event_date == event_date
+    ).first()
+    if db_event is not None:
+        return db_event
+
+    # Another request may create the same event concurrently; the unique
+    # constraint decides and the loser reads the winner's row
+    try:
+        with db.begin_nested():
+            db_event = models.Event(name=name, category=category, event_date=event_date)
+            db.add(db_event)
+    except IntegrityError:
+        db_event = db.query(models.Event).filter(
+            models.Event.name == name,
+            models.Event.event_date == event_date
+        ).one()
+    return db_event
+
+
+def find_event_id(db: Session, name: str, event_date: date):
+    """Look up an event id without creating anything; None if unknown."""
+    return db.query(models.Event.event_id).filter(
+        models.Event.name == name,
+        models.Event.event_date == event_date
+    ).scalar()
@@ -0,0 +1,85 @@
+"""`fields=` and `include=` support for list endpoints.
+
+    GET /tickets/?fields=ticket_id,price,is_sold
+    GET /sell-listings/?include=seller,event
+
+`fields` narrows the SELECT to the named columns. Each `include` adds one
+batched query for the related rows of the whole page, embedded as an
+object under the relation's name.
+"""
+from fastapi import HTTPException
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.orm import Session
+from . import formats, models
+
+# Related objects that can be embedded, keyed by name
+SELLER_COLUMNS = [
+    models.User.user_id,
+    models.User.username,
+    cast(func.avg(models.Review.rating), Float).label("rating"),
+    func.count(models.Review.review_id).label("review_count"),
+]
+
+EVENT_COLUMNS = [
+    models.Event.event_id,
+    models.Event.name,
+    models.Event.category,
+    models.Event.event_date,
+]
+
+
+def _load_sellers(db: Session, ids):
+    rows = db.execute(
+        select(*SELLER_COLUMNS)
+        .outerjoin(models.Review, models.Review.seller_id == models.User.user_id)
+        .where(models.User.user_id.in_(ids))
+        .group_by(models.User.user_id, models.User.username)
+    ).mappings().all()
+    return {row["user_id"]: dict(row) for row in rows}
+
+
+def _load_events(db: Session, ids):
+    rows = db.execute(select(*EVENT_COLUMNS).where(models.Event.event_id.in_(ids))).mappings().all()
+    return {row["event_id"]: dict(row) for row in rows}
+
+
+# name -> (foreign key column name, embedded columns, loader)
+RELATIONS = {
+    "seller": ("seller_id", SELLER_COLUMNS, _load_sellers),
+    "event": ("event_id", EVENT_COLUMNS, _load_events),
+}
+
+
+def _split(value):
+    return [part.strip() for part in value.split(",") if part.strip()] if value else []
+
+
+def select_columns(model, schema, fields: str = None, include: str = None):
+    """Columns to SELECT for the requested fields, plus any keys the includes need."""
+    available = formats.columns_for(model, schema)
+    requested = _split(fields)
+    relations = _split(include)
+
+    unknown = [name for name in requested if name not in schema.__fields__]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    unknown = [name for name in relations if name not in RELATIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(unknown)}")
+
+    names = set(requested) if requested else set(schema.__fields__)
+    names.update(RELATIONS[name][0] for name in relations)
+    return [column for column in available if column.key in names], relations
+
+
+def embed(db: Session, columns, rows, relations):
+    """Append one embedded object per relation to each row, one query per relation."""
+    keys = [column.key for column in columns]
+    for name in relations:
+        foreign_key, related_columns, load = RELATIONS[name]
+        position = keys.index(foreign_key)
+        ids = {row[position] for row in rows if row[position] is not None}
+        related = load(db, ids) if ids else {}
+        rows = [tuple(row) + (related.get(row[position]),) for row in rows]
+        columns = columns + [formats.Embedded(name, related_columns)]
+    return columns, rows
@@ -0,0 +1,194 @@
+"""Response encodings for bulk catalog endpoints.
+
+Clients pick a format with the Accept header:
+
+    application/json                              rows, same as the other endpoints
+    application/vnd.ticketmarket.columnar+json    {"count": n, "columns": {name: [values]}}
+    application/msgpack                           the columnar layout as MessagePack
+    application/vnd.apache.arrow.stream           an Apache Arrow IPC stream
+    application/vnd.apache.arrow.file             an Apache Arrow IPC file (random access)
+
+MessagePack and Arrow need the optional `msgpack` and `pyarrow` packages.
+Large bodies are compressed with brotli (optional `brotli` package) or gzip,
+depending on Accept-Encoding.
+"""
+import gzip
+import json
+from datetime import date, datetime
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.ticketmarket.columnar+json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+
+# Bodies smaller than this aren't worth compressing
+COMPRESS_MIN_BYTES = 1024
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+class Embedded:
+    """A column holding a related object, with the object's own columns."""
+
+    def __init__(self, key, columns):
+        self.key = key
+        self.columns = columns
+
+
+def columns_for(model, schema):
+    """Model columns in the same order as the schema's fields."""
+    return [getattr(model, name) for name in schema.__fields__]
+
+
+def encode_rows(columns, rows):
+    names = [column.key for column in columns]
+    return json.dumps([dict(zip(names, row)) for row in rows], default=_default).encode()
+
+
+def encode_columnar(columns, rows):
+    return json.dumps(_columnar(columns, rows), default=_default).encode()
+
+
+def encode_msgpack(columns, rows):
+    return msgpack.packb(_columnar(columns, rows), default=_default)
+
+
+def _arrow_table(columns, rows):
+    values = list(zip(*rows)) if rows else [() for _ in columns]
+    schema = pyarrow.schema([(column.key, _arrow_type(column)) for column in columns])
+    table = pyarrow.Table.from_arrays(
+        [pyarrow.array(list(column_values), type=field.type) for column_values, field in zip(values, schema)],
+        schema=schema
+    )
+    return table
+
+
+def encode_arrow(columns, rows):
+    table = _arrow_table(columns, rows)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_arrow_file(columns, rows):
+    # File format: ARROW1 magic and a footer, for readers that need random access
+    table = _arrow_table(columns, rows)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _arrow_type(column):
+    # Typed from the model so all-null columns still get a stable schema
+    if isinstance(column, Embedded):
+        return pyarrow.struct([(field.key, _arrow_type(field)) for field in column.columns])
+    column_type = getattr(column, "type", None)
+    if isinstance(column_type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column_type, Integer):
+        return pyarrow.int64()
+    if isinstance(column_type, Float):
+        return pyarrow.float64()
+    if isinstance(column_type, DateTime):
+        return pyarrow.timestamp("us")
+    if isinstance(column_type, Date):
+        return pyarrow.date32()
+    return pyarrow.string()
+
+
+def _columnar(columns, rows):
+    values = list(zip(*rows)) if rows else [() for _ in columns]
+    return {
+        "count": len(rows),
+        "columns": {column.key: list(column_values) for column, column_values in zip(columns, values)},
+    }
+
+
+ENCODERS = {
+    JSON: encode_rows,
+    COLUMNAR_JSON: encode_columnar,
+    MSGPACK: encode_msgpack if msgpack else None,
+    ARROW: encode_arrow if pyarrow else None,
+    ARROW_FILE: encode_arrow_file if pyarrow else None,
+}
+
+ALIASES = {
+    "application/x-msgpack": MSGPACK,
+}
+
+
+def _preferences(header: str):
+    """Media types from an Accept/Accept-Encoding header, best first."""
+    choices = []
+    for position, part in enumerate(header.split(",")):
+        name, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            choices.append((-quality, position, name.lower()))
+    return [name for _, _, name in sorted(choices)]
+
+
+def negotiate(request: Request):
+    accept = request.headers.get("accept", "")
+    if not accept:
+        return JSON
+    for media_type in _preferences(accept):
+        media_type = ALIASES.get(media_type, media_type)
+        if media_type in ("*/*", "application/*"):
+            return JSON
+        if ENCODERS.get(media_type):
+            return media_type
+    raise HTTPException(status_code=406, detail=f"Supported formats: {', '.join(t for t, e in ENCODERS.items() if e)}")
+
+
+def compress(request: Request, body: bytes):
+    """Compress `body` if it's big enough and the client accepts it."""
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    accepted = _preferences(request.headers.get("accept-encoding", ""))
+    for encoding in accepted:
+        if encoding == "br" and brotli:
+            return brotli.compress(body, quality=4), "br"
+        if encoding == "gzip":
+            return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
+
+
+def render(request: Request, columns, rows):
+    """Encode query result rows for the selected model columns in the negotiated format."""
+    media_type = negotiate(request)
+    body, encoding = compress(request, ENCODERS[media_type](columns, rows))
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,209 @@
+"""Group commit for the checkout path.
+
+On SQLite every commit is an fsync under the single writer lock, which caps
+checkouts per second no matter how many requests are waiting. With
+GROUP_COMMIT_WINDOW_MS set, checkouts are handed to one writer thread that
+collects whatever arrives within the window, applies each intent in its own
+SAVEPOINT and commits them all together. Each caller gets its own result or
+error back, or a 503 if the batch takes longer than
+GROUP_COMMIT_TIMEOUT_SECONDS.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from .database import SQLALCHEMY_DATABASE_URL, _connect_args, engine
+
+logger = logging.getLogger(__name__)
+
+# 0 disables group commit; checkouts then commit one by one
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "0"))
+
+# Upper bound on intents per transaction
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "256"))
+
+# How long a request waits for its batch before answering 503
+GROUP_COMMIT_TIMEOUT_SECONDS = float(os.getenv("GROUP_COMMIT_TIMEOUT_SECONDS", "10"))
+
+
+def _writer_engine():
+    if not SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+        return engine
+
+    # The writer gets its own SQLite connection that takes the write lock up
+    # front with BEGIN IMMEDIATE. Letting SQLAlchemy emit BEGIN (instead of
+    # pysqlite's late implicit one) also makes the per-intent SAVEPOINTs nest
+    # inside the batch transaction.
+    writer_engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=_connect_args(SQLALCHEMY_DATABASE_URL))
+
+    @event.listens_for(writer_engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+    @event.listens_for(writer_engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return writer_engine
+
+
+# Results outlive the writer's session, so don't expire them on commit
+WriterSession = sessionmaker(autocommit=False, autoflush=False, bind=_writer_engine(), expire_on_commit=False)
+
+
+class GroupCommitWriter:
+    def __init__(self, session_factory=WriterSession, window_ms: float = GROUP_COMMIT_WINDOW_MS,
+                 max_batch: int = GROUP_COMMIT_MAX_BATCH):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        # Guards _accepting so nothing is queued behind the stop sentinel
+        self._lock = threading.Lock()
+        self._accepting = False
+
+    def start(self):
+        with self._lock:
+            self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+            self._thread.start()
+            self._accepting = True
+
+    def stop(self):
+        """Refuse new intents, finish the queued ones and wait for the thread."""
+        with self._lock:
+            if not self._accepting:
+                return
+            self._accepting = False
+            self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def submit(self, intent, *args) -> Future:
+        """Queue `intent(db, *args)` for the next batch.
+
+        The intent must not commit; it raises to fail just itself. Raises
+        RuntimeError if the writer isn't running.
+        """
+        future = Future()
+        with self._lock:
+            if not self._accepting:
+                raise RuntimeError("Group commit writer is not running")
+            self._queue.put((future, intent, args))
+        return future
+
+    def run(self, intent, *args, timeout: float = None):
+        """Submit `intent` and wait for its result, for use in request handlers.
+
+        Raises a 503 if the writer is stopping or the batch doesn't finish
+        within `timeout` seconds. An intent that times out before its batch
+        starts is cancelled; one that already started may still be committed.
+        """
+        try:
+            future = self.submit(intent, *args)
+        except RuntimeError:
+            raise HTTPException(status_code=503, detail="Checkout is unavailable, please retry")
+        try:
+            return future.result(timeout=GROUP_COMMIT_TIMEOUT_SECONDS if timeout is None else timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise HTTPException(status_code=503, detail="Checkout timed out, check your tickets before retrying")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._apply(batch)
+            except Exception:
+                # Keep serving later batches; _apply has answered this one
+                logger.exception("Group commit batch failed")
+            if stopping:
+                return
+
+    def _apply(self, batch):
+        outcomes = {}
+        failure = None
+        db = None
+        try:
+            db = self.session_factory()
+            for future, intent, args in batch:
+                # Skip intents whose caller already gave up waiting
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with db.begin_nested():
+                        outcomes[future] = (intent(db, *args), None)
+                except Exception as error:
+                    outcomes[future] = (None, error)
+            db.commit()
+        except Exception as error:
+            # The shared commit failed, so nothing in the batch was saved
+            logger.exception("Group commit failed")
+            failure = error
+            if db is not None:
+                try:
+                    db.rollback()
+                except Exception:
+                    logger.exception("Rolling back the group commit failed")
+        finally:
+            try:
+                if db is not None:
+                    db.close()
+            except Exception:
+                logger.exception("Closing the group commit session failed")
+            self._resolve(batch, outcomes, failure)
+
+    @staticmethod
+    def _resolve(batch, outcomes, failure):
+        """Answer every caller in `batch`, whatever happened to the batch."""
+        for future, _, _ in batch:
+            if future.done() or not (future.running() or future.set_running_or_notify_cancel()):
+                continue
+            result, error = outcomes.get(future, (None, None))
+            if failure is not None or future not in outcomes:
+                error = error or failure or RuntimeError("Group commit stopped before running this intent")
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+# Set up on startup when GROUP_COMMIT_WINDOW_MS > 0
+writer = None
+
+
+def start():
+    global writer
+    if GROUP_COMMIT_WINDOW_MS > 0 and writer is None:
+        writer = GroupCommitWriter()
+        writer.start()
+
+
+def stop():
+    global writer
+    if writer is not None:
+        writer.stop()
+        writer = None
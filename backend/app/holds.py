@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from . import models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# How long a seat stays reserved for the buyer who held it
+HOLD_DURATION = timedelta(minutes=10)
+
+# How often the background sweeper clears expired holds
+SWEEP_INTERVAL_SECONDS = 60
+
+
+def not_held(now: datetime):
+    """Filter for tickets nobody currently holds.
+
+    Expired holds count as free, so readers never wait for the sweeper.
+    """
+    return or_(models.Ticket.hold_expires_at == None, models.Ticket.hold_expires_at <= now)
+
+
+def held_by(user_id: int, now: datetime):
+    """Filter for tickets with a live hold owned by `user_id`."""
+    return (models.Ticket.held_by_id == user_id) & (models.Ticket.hold_expires_at > now)
+
+
+def hold_tickets(db: Session, ticket_ids, user_id: int, now: datetime):
+    """Atomically hold the given tickets for a user.
+
+    The conditional UPDATE only touches seats that are still unsold and not
+    held, so two buyers racing for the same seat cannot both win.
+    Returns the number of seats actually held; the caller decides whether
+    to commit or roll back.
+    """
+    result = db.execute(
+        update(models.Ticket)
+        .where(
+            models.Ticket.ticket_id.in_(ticket_ids),
+            models.Ticket.is_sold == False,
+            not_held(now),
+        )
+        .values(held_by_id=user_id, hold_expires_at=now + HOLD_DURATION)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def release_holds(db: Session, user_id: int, ticket_ids=None):
+    """Release the user's holds, optionally limited to some tickets."""
+    query = update(models.Ticket).where(
+        models.Ticket.held_by_id == user_id,
+        models.Ticket.is_sold == False,
+    )
+    if ticket_ids:
+        query = query.where(models.Ticket.ticket_id.in_(ticket_ids))
+    result = db.execute(
+        query.values(held_by_id=None, hold_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def release_expired_holds(db: Session, now: datetime):
+    result = db.execute(
+        update(models.Ticket)
+        .where(models.Ticket.hold_expires_at <= now)
+        .values(held_by_id=None, hold_expires_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _sweep_once():
+    db = SessionLocal()
+    try:
+        released = release_expired_holds(db, datetime.utcnow())
+        db.commit()
+        if released:
+            logger.info(f"Released {released} expired ticket holds")
+    finally:
+        db.close()
+
+
+async def sweep_expired_holds():
+    """Background loop that clears expired holds so the index stays tight."""
+    while True:
+        try:
+            await run_in_threadpool(_sweep_once)
+        except Exception:
+            logger.exception("Expired hold sweep failed")
+        await asyncio.sleep(SWEEP_INTERVAL_SECONDS)
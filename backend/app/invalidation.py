@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, func, insert, or_, select
+from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from . import models
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# How often each worker checks table_changes for writes made by other workers
+POLL_INTERVAL_SECONDS = float(os.getenv("INVALIDATION_POLL_SECONDS", "0.5"))
+
+# Changes older than this are pruned; a worker that hasn't polled for half of
+# it treats every table as changed
+CHANGE_RETENTION_SECONDS = 10 * 60
+PRUNE_INTERVAL_SECONDS = 60
+
+# change_ids are handed out before commit, so on Postgres a lower id can
+# commit after a higher one was read. Missing ids are re-checked for this long
+# before they are taken to be rolled back.
+GAP_TIMEOUT_SECONDS = 5
+
+CHANGES = models.TableChange.__table__
+
+
+class InvalidationBus:
+    """Tells in-process caches when a table changed, in this worker or another.
+
+    Every commit appends a table_changes row per table it wrote, in the same
+    transaction. Local subscribers hear about a commit right away; other
+    workers see the new rows on their next poll.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(list)
+        # Highest change_id read so far, None until the first poll
+        self._last_seen = None
+        # change_ids below _last_seen not committed yet when polled -> when noticed
+        self._gaps = {}
+        self._polled_at = None
+        # Invalidations published per table in this worker, see generation()
+        self._generations = Counter()
+        self._generations_lock = threading.Lock()
+
+    def subscribe(self, table_name: str, callback):
+        """Call `callback(table_name)` whenever `table_name` changes.
+
+        Subscribe at import time so every worker tracks the same tables.
+        """
+        self._subscribers[table_name].append(callback)
+
+    def subscribed(self, table_names):
+        """The tables in `table_names` that some cache listens to."""
+        return {table_name for table_name in table_names if table_name in self._subscribers}
+
+    def generation(self, table_name: str):
+        """How many times `table_name` has been invalidated in this worker.
+
+        Caches read it before loading and only store the result if it hasn't
+        moved, so an invalidation that lands mid-load isn't lost.
+        """
+        with self._generations_lock:
+            return self._generations[table_name]
+
+    def publish(self, table_names):
+        for table_name in table_names:
+            with self._generations_lock:
+                self._generations[table_name] += 1
+            for callback in self._subscribers.get(table_name, []):
+                try:
+                    callback(table_name)
+                except Exception:
+                    logger.exception(f"Invalidation callback for {table_name} failed")
+
+    def poll(self, db: Session):
+        """Read new table_changes rows and publish every table they name.
+
+        The first call only records where the log ends. This worker's own
+        commits get published a second time here, which only costs a cache
+        reload.
+        """
+        now = time.monotonic()
+        if self._last_seen is None:
+            self._last_seen = db.execute(select(func.max(CHANGES.c.change_id))).scalar() or 0
+            self._polled_at = now
+            return []
+
+        new = CHANGES.c.change_id > self._last_seen
+        if self._gaps:
+            new = or_(new, CHANGES.c.change_id.in_(sorted(self._gaps)))
+        rows = db.execute(select(CHANGES.c.change_id, CHANGES.c.table_name).where(new)).all()
+
+        if now - self._polled_at > CHANGE_RETENTION_SECONDS / 2:
+            # Rows this worker never read may already have been pruned
+            changed = set(self._subscribers)
+        else:
+            changed = {table_name for _, table_name in rows}
+
+        seen = {change_id for change_id, _ in rows}
+        top = max(seen | {self._last_seen})
+        for change_id in range(self._last_seen + 1, top):
+            if change_id not in seen:
+                self._gaps[change_id] = now
+        self._gaps = {
+            change_id: noticed for change_id, noticed in self._gaps.items()
+            if change_id not in seen and now - noticed < GAP_TIMEOUT_SECONDS
+        }
+        self._last_seen = top
+        self._polled_at = now
+
+        changed = sorted(changed)
+        self.publish(changed)
+        return changed
+
+
+bus = InvalidationBus()
+
+
+def _touched(session: Session):
+    return session.info.setdefault("touched_tables", set())
+
+
+def _record(connection, table_names):
+    created_date = datetime.utcnow()
+    connection.execute(
+        insert(CHANGES),
+        [{"table_name": table_name, "created_date": created_date} for table_name in sorted(table_names)],
+    )
+
+
+def _after_flush(session, flush_context):
+    _touched(session).update(
+        obj.__table__.name
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if hasattr(obj, "__table__")
+    )
+
+
+def _bulk_write(orm_execute_state):
+    # Bulk update()/delete()/insert() statements skip the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _touched(orm_execute_state.session).add(table.name)
+
+
+def _before_commit(session):
+    # One change row per written table per commit, inside the committing
+    # transaction. Only tables with subscribers are logged. Goes straight to
+    # the connection so it doesn't re-enter the hooks above.
+    session.flush()
+    table_names = bus.subscribed(_touched(session))
+    if table_names:
+        _record(session.connection(), table_names)
+
+
+def _after_commit(session):
+    table_names = bus.subscribed(session.info.pop("touched_tables", ()))
+    if table_names:
+        bus.publish(table_names)
+
+
+def _after_rollback(session):
+    session.info.pop("touched_tables", None)
+
+
+def install():
+    """Register the session hooks that log table changes on write."""
+    for name, listener in [
+        ("after_flush", _after_flush),
+        ("do_orm_execute", _bulk_write),
+        ("before_commit", _before_commit),
+        ("after_commit", _after_commit),
+        ("after_rollback", _after_rollback),
+    ]:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+def prune(db: Session):
+    """Delete changes every worker has long since read."""
+    cutoff = datetime.utcnow() - timedelta(seconds=CHANGE_RETENTION_SECONDS)
+    db.execute(delete(CHANGES).where(CHANGES.c.created_date < cutoff))
+    db.commit()
+
+
+def poll_once():
+    """Poll the bus once. The first call only records where the log ends."""
+    db = SessionLocal()
+    try:
+        bus.poll(db)
+    finally:
+        db.close()
+
+
+def _prune_once():
+    db = SessionLocal()
+    try:
+        prune(db)
+    finally:
+        db.close()
+
+
+async def poll_periodically():
+    """Background loop picking up writes committed by other workers."""
+    pruned_at = time.monotonic()
+    while True:
+        try:
+            await run_in_threadpool(poll_once)
+            if time.monotonic() - pruned_at > PRUNE_INTERVAL_SECONDS:
+                await run_in_threadpool(_prune_once)
+                pruned_at = time.monotonic()
+        except Exception:
+            logger.exception("Polling table changes failed")
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
@@ -1,34 +1,121 @@
-from fastapi import FastAPI
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from . import models
-from .database import engine
-from .routers import users, tickets, sell_listings, buy_requests, reviews, transactions
-
-# Create the database tables
-models.Base.metadata.create_all(bind=engine)
-
-# Create the FastAPI app
-app = FastAPI(title="TicketMarket API")
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(users.router)
-app.include_router(tickets.router)
-app.include_router(sell_listings.router)
-app.include_router(buy_requests.router)
-app.include_router(reviews.router)
-
-app.include_router(transactions.router)  # add this line
-
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to the TicketMarket API"}
+from fastapi.responses import JSONResponse
+from . import holds, archive, query_budget, invalidation, group_commit, startup
+from .config import Settings
+from .database import LAST_WRITE_HEADER, engine, read_engine, record_write
+from .routers import users, tickets, sell_listings, buy_requests, reviews, transactions, events
+
+logger = logging.getLogger(__name__)
+
+_import_seconds = time.perf_counter() - _import_started
+
+
+def create_app(settings: Settings = None) -> FastAPI:
+    """Build the API. Logging, global hooks and the database are only touched once it starts up."""
+    settings = settings or Settings.from_env()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        started = time.perf_counter()
+        logging.basicConfig(level=settings.log_level)
+
+        # Log table changes on commit so other workers can drop stale caches
+        invalidation.install()
+
+        # Count statements per request and fail fast on unplanned lazy loads
+        query_budget.instrument(engine, read_engine)
+
+        app.state.timings = await run_in_threadpool(startup.warm_up, settings)
+
+        background = []
+        if settings.background_tasks:
+            background = [
+                asyncio.create_task(holds.sweep_expired_holds()),
+                asyncio.create_task(archive.archive_periodically()),
+                asyncio.create_task(invalidation.poll_periodically()),
+            ]
+            group_commit.start()
+
+        app.state.startup_seconds = time.perf_counter() - started
+        if _import_seconds + app.state.startup_seconds > settings.startup_budget_seconds:
+            logger.warning(
+                f"Startup took {_import_seconds + app.state.startup_seconds:.2f}s "
+                f"(import {_import_seconds:.2f}s), budget is {settings.startup_budget_seconds}s"
+            )
+        app.state.ready = True
+        yield
+
+        app.state.ready = False
+        for task in background:
+            task.cancel()
+        group_commit.stop()
+
+    # Create the FastAPI app
+    app = FastAPI(title="TicketMarket API", lifespan=lifespan)
+    app.state.settings = settings
+    app.state.ready = False
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[LAST_WRITE_HEADER],
+    )
+
+    @app.middleware("http")
+    async def track_writes(request: Request, call_next):
+        response = await call_next(request)
+        # Pin the caller's reads to the primary for a moment after a successful write
+        if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            record_write(response)
+        return response
+
+    @app.middleware("http")
+    async def count_queries(request: Request, call_next):
+        with query_budget.count_queries(enforce=query_budget.QUERY_BUDGET_ENFORCE) as stats:
+            response = await call_next(request)
+        response.headers["X-Query-Count"] = str(stats.count)
+        query_budget.report(request.url.path, stats)
+        return response
+
+    # Include routers
+    app.include_router(users.router)
+    app.include_router(tickets.router)
+    app.include_router(sell_listings.router)
+    app.include_router(buy_requests.router)
+    app.include_router(reviews.router)
+    app.include_router(events.router)
+    app.include_router(transactions.router)
+
+    @app.get("/")
+    def read_root():
+        return {"message": "Welcome to the TicketMarket API"}
+
+    @app.get("/ready")
+    def read_ready(request: Request):
+        """200 once startup warm-up has finished, 503 before that"""
+        state = request.app.state
+        if not state.ready:
+            return JSONResponse(status_code=503, content={"ready": False})
+        return {
+            "ready": True,
+            "import_seconds": round(_import_seconds, 4),
+            "startup_seconds": round(state.startup_seconds, 4),
+            "steps": state.timings,
+        }
+
+    return app
+
 
+app = create_app()
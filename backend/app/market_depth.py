@@ -0,0 +1,96 @@
+import threading
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models
+from .buy_requests import fulfilled_clause
+from .invalidation import bus
+
+ASK = "ask"
+BID = "bid"
+
+LEVELS = models.PriceLevel.__table__
+
+# event_id -> depth response; cleared whenever price_levels changes in any worker
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _clear_cache(table_name):
+    with _cache_lock:
+        _cache.clear()
+
+
+bus.subscribe(LEVELS.name, _clear_cache)
+
+
+def adjust(db: Session, event_id: int, side: str, price: float, delta: int):
+    """Add `delta` to the quantity at one price level, in the caller's transaction."""
+    if event_id is None or not delta:
+        return
+    key = (LEVELS.c.event_id == event_id) & (LEVELS.c.side == side) & (LEVELS.c.price == price)
+    result = db.execute(update(LEVELS).where(key).values(quantity=LEVELS.c.quantity + delta))
+    if result.rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(LEVELS).values(event_id=event_id, side=side, price=price, quantity=delta))
+    except IntegrityError:
+        # Someone else created the level first
+        db.execute(update(LEVELS).where(key).values(quantity=LEVELS.c.quantity + delta))
+
+
+def get_depth(db: Session, event_id: int):
+    """Price levels for an event, served from the cache when possible.
+
+    Returns None if the event doesn't exist.
+    """
+    with _cache_lock:
+        depth = _cache.get(event_id)
+    if depth is not None:
+        return depth
+
+    generation = bus.generation(LEVELS.name)
+    # Outer join from events so an unknown event comes back as no rows at all
+    rows = db.execute(
+        select(LEVELS.c.side, LEVELS.c.price, LEVELS.c.quantity)
+        .select_from(models.Event)
+        .outerjoin(LEVELS, (LEVELS.c.event_id == models.Event.event_id) & (LEVELS.c.quantity > 0))
+        .where(models.Event.event_id == event_id)
+        .order_by(LEVELS.c.side, LEVELS.c.price)
+    ).all()
+    if not rows:
+        return None
+    asks = [{"price": price, "quantity": quantity} for side, price, quantity in rows if side == ASK]
+    bids = [{"price": price, "quantity": quantity} for side, price, quantity in rows if side == BID]
+    bids.reverse()  # best (highest) bid first
+    depth = {"event_id": event_id, "asks": asks, "bids": bids}
+
+    # Only cache what we read if price_levels wasn't invalidated meanwhile
+    with _cache_lock:
+        if bus.generation(LEVELS.name) == generation:
+            _cache[event_id] = depth
+    return depth
+
+
+def rebuild(db: Session):
+    """Recompute every price level from the raw tables. Used for backfill."""
+    db.execute(delete(LEVELS))
+    db.execute(insert(LEVELS).from_select(
+        ["event_id", "side", "price", "quantity"],
+        select(models.Ticket.event_id, literal(ASK), models.Ticket.price, func.count())
+        .where(models.Ticket.is_sold == False, models.Ticket.event_id != None)
+        .group_by(models.Ticket.event_id, models.Ticket.price)
+    ))
+    db.execute(insert(LEVELS).from_select(
+        ["event_id", "side", "price", "quantity"],
+        select(models.BuyRequest.event_id, literal(BID), models.BuyRequest.max_price, func.sum(models.BuyRequest.quantity))
+        .where(models.BuyRequest.event_id != None, ~fulfilled_clause())
+        .group_by(models.BuyRequest.event_id, models.BuyRequest.max_price)
+    ))
+
+
+def drop_past_events(db: Session, today):
+    """Forget depth for events that already happened."""
+    past = select(models.Event.event_id).where(models.Event.event_date < today)
+    db.execute(delete(LEVELS).where(LEVELS.c.event_id.in_(past)))
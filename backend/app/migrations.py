@@ -0,0 +1,184 @@
+import logging
+from sqlalchemy import inspect, select, text
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.orm import Session
+from . import archive, market_depth, models, price_history
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(engine):
+    """Add columns that exist on the models but not yet in the database.
+
+    `create_all` only creates missing tables, so an existing ticket_market.db
+    never picks up new nullable columns or indexes on its own.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                logger.info(f"Adding column {table.name}.{column.name}")
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+    # Create any indexes declared on the models that are still missing
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def _sqlite_ddl(conn, table_name):
+    return conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table_name}
+    ).scalar()
+
+
+def _rebuild_sqlite_table(conn, table):
+    """Recreate `table` from its model definition, keeping the rows.
+
+    SQLite can't alter constraints in place, so this copies into a new table
+    built from the current model and swaps it in.
+    """
+    staging = f"{table.name}_rebuild"
+    create = str(CreateTable(table).compile(dialect=conn.dialect))
+    conn.execute(text(create.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {staging} ", 1)))
+    columns = ", ".join(column.name for column in table.columns)
+    conn.execute(text(f"INSERT INTO {staging} ({columns}) SELECT {columns} FROM {table.name}"))
+    conn.execute(text(f"DROP TABLE {table.name}"))
+    conn.execute(text(f"ALTER TABLE {staging} RENAME TO {table.name}"))
+    for index in table.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+def drop_transaction_ticket_fk(engine):
+    """Remove the transactions -> tickets foreign key.
+
+    Archiving deletes tickets, and with the old ON DELETE CASCADE any backend
+    that enforces foreign keys would delete their sales along with them.
+    """
+    table = models.Transaction.__table__
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            if "REFERENCES tickets" in _sqlite_ddl(conn, table.name):
+                logger.info(f"Rebuilding {table.name} without the tickets foreign key")
+                _rebuild_sqlite_table(conn, table)
+            return
+        for foreign_key in inspect(conn).get_foreign_keys(table.name):
+            if foreign_key["referred_table"] == "tickets" and foreign_key["name"]:
+                logger.info(f"Dropping foreign key {foreign_key['name']} on {table.name}")
+                conn.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT {foreign_key['name']}"))
+
+
+def use_autoincrement_ids(engine):
+    """Make SQLite ids on the archived tables monotonic.
+
+    Without AUTOINCREMENT SQLite reuses the highest deleted rowid, and
+    archiving deletes rows, so new tickets used to take over archived ids.
+    Tables created before that are rebuilt, and each sequence is started
+    past the highest id in the table or its archive.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    for live, archived in archive.ARCHIVED_MODELS:
+        table = live.__table__
+        primary_key = table.primary_key.columns.values()[0].name
+        with engine.begin() as conn:
+            if "AUTOINCREMENT" not in _sqlite_ddl(conn, table.name).upper():
+                logger.info(f"Rebuilding {table.name} with AUTOINCREMENT ids")
+                _rebuild_sqlite_table(conn, table)
+
+            top = conn.execute(text(f"""
+                SELECT MAX(id) FROM (
+                    SELECT MAX({primary_key}) AS id FROM {table.name}
+                    UNION ALL SELECT MAX({primary_key}) FROM {archived.__tablename__}
+                )
+            """)).scalar() or 0
+            params = {"name": table.name, "top": top}
+            if not conn.execute(text("UPDATE sqlite_sequence SET seq = MAX(seq, :top) WHERE name = :name"), params).rowcount:
+                conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :top)"), params)
+
+            clashes = conn.execute(text(f"""
+                SELECT COUNT(*) FROM {table.name}
+                WHERE {primary_key} IN (SELECT {primary_key} FROM {archived.__tablename__})
+            """)).scalar()
+            if clashes:
+                logger.warning(f"{clashes} {table.name} rows reuse an archived id and won't be archived")
+
+
+# Tables no model uses any more
+RETIRED_TABLES = [
+    "table_versions",  # replaced by table_changes
+]
+
+
+def drop_retired_tables(engine):
+    with engine.begin() as conn:
+        for table_name in RETIRED_TABLES:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+
+
+# Tables whose event_name/event_date get linked to an events row
+EVENT_TABLES = [
+    "tickets", "sell_listings", "buy_requests",
+    "tickets_archive", "sell_listings_archive", "buy_requests_archive",
+]
+
+
+def backfill_events(engine):
+    """Create events for existing rows and fill in their event_id."""
+    source = " UNION ALL ".join(
+        f"SELECT event_name, category, event_date FROM {table}" for table in EVENT_TABLES
+    )
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            INSERT INTO events (name, category, event_date)
+            SELECT src.event_name, MIN(src.category), src.event_date
+            FROM ({source}) AS src
+            WHERE NOT EXISTS (
+                SELECT 1 FROM events e
+                WHERE e.name = src.event_name AND e.event_date = src.event_date
+            )
+            GROUP BY src.event_name, src.event_date
+        """))
+        for table in EVENT_TABLES:
+            result = conn.execute(text(f"""
+                UPDATE {table} SET event_id = (
+                    SELECT e.event_id FROM events e
+                    WHERE e.name = {table}.event_name AND e.event_date = {table}.event_date
+                )
+                WHERE event_id IS NULL
+            """))
+            if result.rowcount:
+                logger.info(f"Linked {result.rowcount} {table} rows to events")
+
+
+def backfill_price_levels(engine):
+    """Build market depth from the raw tables the first time it's needed."""
+    with Session(engine) as db:
+        if db.execute(select(models.PriceLevel.event_id).limit(1)).first() is None:
+            market_depth.rebuild(db)
+            db.commit()
+
+
+def backfill_price_history(engine):
+    """Downsample past transactions into price buckets the first time they're needed."""
+    with Session(engine) as db:
+        if db.execute(select(models.PriceBucket.event_id).limit(1)).first() is None:
+            price_history.rebuild(db)
+            db.commit()
+
+
+def run_migrations(engine):
+    add_missing_columns(engine)
+    use_autoincrement_ids(engine)
+    drop_transaction_ticket_fk(engine)
+    drop_retired_tables(engine)
+    backfill_events(engine)
+    backfill_price_levels(engine)
+    backfill_price_history(engine)
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, Date, JSON, DateTime, Text, CheckConstraint
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, Date, JSON, DateTime, Text, CheckConstraint, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import ARRAY ## ADD HERE3
@@ -29,25 +29,61 @@ class User(Base):
     )
 
 
+class Event(Base):
+    __tablename__ = "events"
+
+    event_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    name = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    event_date = Column(Date, nullable=False, index=True)
+    created_date = Column(DateTime, default=func.now())
+
+    # Relationships
+    tickets = relationship("Ticket", back_populates="event")
+    sell_listings = relationship("SellListing", back_populates="event")
+    buy_requests = relationship("BuyRequest", back_populates="event")
+
+    __table_args__ = (
+        # An event is identified by its name and date, like the old string matching
+        UniqueConstraint("name", "event_date"),
+        CheckConstraint("category IN ('Concert', 'Sports', 'Theater', 'Other')"),
+    )
+
+
 class Ticket(Base):
     __tablename__ = "tickets"
 
     ticket_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     event_name = Column(String, nullable=False)
     category = Column(String, nullable=False)
-    event_date = Column(Date, nullable=False)
+    event_date = Column(Date, nullable=False, index=True)
     price = Column(Float, nullable=False)
     seller_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
     buyer_id = Column(Integer, ForeignKey("users.user_id", ondelete="SET NULL"), nullable=True)
     is_sold = Column(Boolean, default=False)
+    held_by_id = Column(Integer, ForeignKey("users.user_id", ondelete="SET NULL"), nullable=True)
+    hold_expires_at = Column(DateTime, nullable=True)
+    event_id = Column(Integer, ForeignKey("events.event_id"), nullable=True)
 
     # Relationships
+    event = relationship("Event", back_populates="tickets")
     seller = relationship("User", foreign_keys=[seller_id], back_populates="tickets_selling")
     buyer = relationship("User", foreign_keys=[buyer_id], back_populates="tickets_bought")
-    transactions = relationship("Transaction", back_populates="ticket")
+    held_by = relationship("User", foreign_keys=[held_by_id])
+    transactions = relationship(
+        "Transaction", primaryjoin="Ticket.ticket_id == foreign(Transaction.ticket_id)", back_populates="ticket"
+    )
 
     __table_args__ = (
         CheckConstraint("category IN ('Concert', 'Sports', 'Theater', 'Other')"),
+        # Catalog reads filter on unsold and not-currently-held seats
+        Index("ix_tickets_available", "is_sold", "hold_expires_at"),
+        Index("ix_tickets_held_by", "held_by_id"),
+        Index("ix_tickets_event_available", "event_id", "is_sold"),
+        Index("ix_tickets_buyer_event", "buyer_id", "event_id"),
+        Index("ix_tickets_seller_event", "seller_id", "event_id", "is_sold"),
+        # Never hand out an id again once its row has moved to the archive
+        {"sqlite_autoincrement": True},
     )
 
 
@@ -55,7 +91,8 @@ class Transaction(Base):
     __tablename__ = "transactions"
 
     transaction_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    ticket_id = Column(Integer, ForeignKey("tickets.ticket_id", ondelete="CASCADE"), nullable=False)
+    # No foreign key: transactions outlive their ticket once it is archived
+    ticket_id = Column(Integer, nullable=False)
     seller_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
     buyer_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
     payment_method = Column(String, nullable=False)
@@ -64,10 +101,13 @@ class Transaction(Base):
 
 
     # Relationships
-    ticket = relationship("Ticket", back_populates="transactions")
+    ticket = relationship(
+        "Ticket", primaryjoin="foreign(Transaction.ticket_id) == Ticket.ticket_id", back_populates="transactions"
+    )
 
     __table_args__ = (
         CheckConstraint("payment_method IN ('Credit Card', 'PayPal', 'Bank Transfer')"),
+        Index("ix_transactions_seller", "seller_id"),
     )
 
 
@@ -97,18 +137,22 @@ class SellListing(Base):
     seller_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
     event_name = Column(String, nullable=False)
     category = Column(String, nullable=False)
-    event_date = Column(Date, nullable=False)
+    event_date = Column(Date, nullable=False, index=True)
     price = Column(Float, nullable=False)
     quantity = Column(Integer, nullable=False)
     created_date = Column(DateTime, default=func.now())
     is_available = Column(Boolean, default=True) ## ADDED HERE
+    event_id = Column(Integer, ForeignKey("events.event_id"), nullable=True, index=True)
 
 
     # Relationships
+    event = relationship("Event", back_populates="sell_listings")
     seller = relationship("User", back_populates="sell_listings")
 
     __table_args__ = (
         CheckConstraint("category IN ('Concert', 'Sports', 'Theater', 'Other')"),
+        Index("ix_sell_listings_seller", "seller_id", "is_available"),
+        {"sqlite_autoincrement": True},
     )
 
 
@@ -119,14 +163,123 @@ class BuyRequest(Base):
     buyer_id = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
     event_name = Column(String, nullable=False)
     category = Column(String, nullable=False)
-    event_date = Column(Date, nullable=False)
+    event_date = Column(Date, nullable=False, index=True)
     max_price = Column(Float, nullable=False)
     quantity = Column(Integer, nullable=False)
     created_date = Column(DateTime, default=func.now())
+    event_id = Column(Integer, ForeignKey("events.event_id"), nullable=True, index=True)
 
     # Relationships
+    event = relationship("Event", back_populates="buy_requests")
     buyer = relationship("User", back_populates="buy_requests")
 
     __table_args__ = (
         CheckConstraint("category IN ('Concert', 'Sports', 'Theater', 'Other')"),
+        Index("ix_buy_requests_buyer", "buyer_id"),
+        {"sqlite_autoincrement": True},
+    )
+
+
+# Archive tables
+# Rows for events that already happened are moved here by app/archive.py so the
+# live tables only hold upcoming events. They keep the original primary keys so
+# transactions keep pointing at the right ticket; the live tables use
+# AUTOINCREMENT so SQLite never reuses an archived id.
+
+class TicketArchive(Base):
+    __tablename__ = "tickets_archive"
+
+    ticket_id = Column(Integer, primary_key=True)
+    event_name = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    event_date = Column(Date, nullable=False)
+    price = Column(Float, nullable=False)
+    seller_id = Column(Integer, nullable=False, index=True)
+    buyer_id = Column(Integer, nullable=True, index=True)
+    is_sold = Column(Boolean, default=False)
+    event_id = Column(Integer, nullable=True, index=True)
+    archived_date = Column(DateTime, default=func.now())
+
+
+class SellListingArchive(Base):
+    __tablename__ = "sell_listings_archive"
+
+    sell_id = Column(Integer, primary_key=True)
+    seller_id = Column(Integer, nullable=False, index=True)
+    event_name = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    event_date = Column(Date, nullable=False)
+    price = Column(Float, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    created_date = Column(DateTime)
+    is_available = Column(Boolean, default=True)
+    event_id = Column(Integer, nullable=True, index=True)
+    archived_date = Column(DateTime, default=func.now())
+
+
+class BuyRequestArchive(Base):
+    __tablename__ = "buy_requests_archive"
+
+    request_id = Column(Integer, primary_key=True)
+    buyer_id = Column(Integer, nullable=False, index=True)
+    event_name = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    event_date = Column(Date, nullable=False)
+    max_price = Column(Float, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    created_date = Column(DateTime)
+    event_id = Column(Integer, nullable=True, index=True)
+    archived_date = Column(DateTime, default=func.now())
+
+
+class PriceLevel(Base):
+    __tablename__ = "price_levels"
+
+    # Market depth per event, kept up to date by app/market_depth.py as tickets
+    # are listed and sold and buy requests come in.
+    # side is 'ask' (unsold tickets at price) or 'bid' (requested quantity at max_price)
+    event_id = Column(Integer, primary_key=True)
+    side = Column(String, primary_key=True)
+    price = Column(Float, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        CheckConstraint("side IN ('ask', 'bid')"),
+    )
+
+
+class PriceBucket(Base):
+    __tablename__ = "price_buckets"
+
+    # Sale prices per event downsampled to OHLC/volume, one row per bucket per
+    # resolution ('minute', 'hour', 'day'). Updated on every sale by
+    # app/price_history.py; kept after the event is archived.
+    event_id = Column(Integer, primary_key=True)
+    resolution = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        CheckConstraint("resolution IN ('minute', 'hour', 'day')"),
+    )
+
+
+class TableChange(Base):
+    __tablename__ = "table_changes"
+
+    # Append-only: one row per written table, inserted by every commit that
+    # writes it. Workers poll for new rows to drop stale in-process caches
+    # (see app/invalidation.py). Inserts don't contend on a shared row the
+    # way bumping a per-table counter did. Old rows are pruned.
+    change_id = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String, nullable=False)
+    created_date = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Pruning deletes old rows; ids must never be handed out again
+        {"sqlite_autoincrement": True},
     )
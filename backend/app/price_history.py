@@ -0,0 +1,130 @@
+import json
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import models
+from .database import ReadSessionLocal
+
+BUCKETS = models.PriceBucket.__table__
+
+# Resolution name -> start of the bucket a timestamp falls in
+RESOLUTIONS = {
+    "minute": lambda t: t.replace(second=0, microsecond=0),
+    "hour": lambda t: t.replace(minute=0, second=0, microsecond=0),
+    "day": lambda t: t.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+
+# Rows fetched per round trip when streaming or backfilling
+BATCH_SIZE = 1000
+
+
+def record_sales(db: Session, event_id: int, prices, sold_at):
+    """Fold sales made together into the event's buckets, in the caller's transaction.
+
+    `prices` are in sale order. One upsert per resolution however many seats
+    were sold.
+    """
+    if event_id is None or not prices:
+        return
+    high, low, close, volume = max(prices), min(prices), prices[-1], len(prices)
+    for resolution, truncate in RESOLUTIONS.items():
+        key = (
+            (BUCKETS.c.event_id == event_id)
+            & (BUCKETS.c.resolution == resolution)
+            & (BUCKETS.c.bucket_start == truncate(sold_at))
+        )
+        changes = {
+            "high": case((BUCKETS.c.high < high, high), else_=BUCKETS.c.high),
+            "low": case((BUCKETS.c.low > low, low), else_=BUCKETS.c.low),
+            "close": close,
+            "volume": BUCKETS.c.volume + volume,
+        }
+        if db.execute(update(BUCKETS).where(key).values(**changes)).rowcount:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(insert(BUCKETS).values(
+                    event_id=event_id, resolution=resolution, bucket_start=truncate(sold_at),
+                    open=prices[0], high=high, low=low, close=close, volume=volume,
+                ))
+        except IntegrityError:
+            # Another sale opened the bucket first
+            db.execute(update(BUCKETS).where(key).values(**changes))
+
+
+def stream(event_id: int, resolution: str, start=None, end=None):
+    """Yield the buckets as a JSON array, one batch of rows at a time.
+
+    Uses its own session so the rows are read while the response is being
+    sent, without holding the whole range in memory.
+    """
+    query = (
+        select(BUCKETS.c.bucket_start, BUCKETS.c.open, BUCKETS.c.high,
+               BUCKETS.c.low, BUCKETS.c.close, BUCKETS.c.volume)
+        .where(BUCKETS.c.event_id == event_id, BUCKETS.c.resolution == resolution)
+        .order_by(BUCKETS.c.bucket_start)
+    )
+    if start is not None:
+        query = query.where(BUCKETS.c.bucket_start >= RESOLUTIONS[resolution](start))
+    if end is not None:
+        query = query.where(BUCKETS.c.bucket_start < end)
+
+    db = ReadSessionLocal()
+    try:
+        separator = "["
+        for batch in db.execute(query.execution_options(yield_per=BATCH_SIZE)).partitions():
+            yield separator + ",".join(
+                json.dumps({
+                    "bucket_start": bucket_start.isoformat(),
+                    "open": open_, "high": high, "low": low, "close": close, "volume": volume,
+                })
+                for bucket_start, open_, high, low, close, volume in batch
+            )
+            separator = ","
+        yield "[]" if separator == "[" else "]"
+    finally:
+        db.close()
+
+
+def _flush(db: Session, event_id, buckets):
+    if buckets:
+        db.execute(insert(BUCKETS), [
+            {"event_id": event_id, "resolution": resolution, "bucket_start": bucket_start,
+             "open": o, "high": h, "low": l, "close": c, "volume": v}
+            for (resolution, bucket_start), (o, h, l, c, v) in buckets.items()
+        ])
+
+
+def rebuild(db: Session):
+    """Recompute every bucket from the transactions table. Used for backfill.
+
+    Sales are read in (event, time) order, so only one event's buckets are
+    in memory at a time.
+    """
+    db.execute(delete(BUCKETS))
+    event_id = func.coalesce(models.Ticket.event_id, models.TicketArchive.event_id)
+    rows = db.execute(
+        select(event_id, models.Transaction.price, models.Transaction.transaction_date)
+        .select_from(models.Transaction)
+        .outerjoin(models.Ticket, models.Ticket.ticket_id == models.Transaction.ticket_id)
+        .outerjoin(models.TicketArchive, models.TicketArchive.ticket_id == models.Transaction.ticket_id)
+        .where(event_id != None, models.Transaction.price != None, models.Transaction.transaction_date != None)
+        .order_by(event_id, models.Transaction.transaction_date, models.Transaction.transaction_id)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+
+    current, buckets = None, {}
+    for row_event_id, price, sold_at in rows:
+        if row_event_id != current:
+            _flush(db, current, buckets)
+            current, buckets = row_event_id, {}
+        for resolution, truncate in RESOLUTIONS.items():
+            bucket = buckets.get((resolution, truncate(sold_at)))
+            if bucket is None:
+                buckets[(resolution, truncate(sold_at))] = [price, price, price, price, 1]
+            else:
+                bucket[1] = max(bucket[1], price)
+                bucket[2] = min(bucket[2], price)
+                bucket[3] = price
+                bucket[4] += 1
+    _flush(db, current, buckets)
@@ -0,0 +1,105 @@
+import logging
+import os
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.orm import Session, raiseload
+
+logger = logging.getLogger(__name__)
+
+# Raise instead of logging when a request goes over its query budget.
+# Test runs set this so a regression fails loudly.
+QUERY_BUDGET_ENFORCE = os.getenv("QUERY_BUDGET_ENFORCE", "0") == "1"
+
+# Make every ORM query default to raiseload("*"), so touching a relationship
+# that wasn't loaded up front (selectinload/joinedload) raises instead of
+# quietly issuing one SELECT per row
+STRICT_LOADING = os.getenv("STRICT_LOADING", "1") == "1"
+
+# Not counted against the budget
+TRANSACTION_CONTROL = ("BEGIN", "SAVEPOINT", "RELEASE", "ROLLBACK", "COMMIT")
+
+# The same SQL text this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    def __init__(self, budget=None, enforce=False):
+        self.count = 0
+        self.budget = budget
+        self.enforce = enforce
+        self.statements = Counter()
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Statements issued at least `threshold` times, most frequent first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+_current_stats = ContextVar("query_stats", default=None)
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None or statement.startswith(TRANSACTION_CONTROL):
+        return
+    stats.count += 1
+    stats.statements[statement] += 1
+    if stats.enforce and stats.budget is not None and stats.count > stats.budget:
+        raise QueryBudgetExceeded(f"Query budget of {stats.budget} exceeded by: {statement}")
+
+
+def _default_raiseload(orm_execute_state):
+    if (
+        orm_execute_state.is_select
+        and not orm_execute_state.is_column_load
+        and not orm_execute_state.is_relationship_load
+    ):
+        orm_execute_state.statement = orm_execute_state.statement.options(raiseload("*", sql_only=True))
+
+
+def instrument(*engines):
+    """Hook statement counting into the engines, and strict loading into sessions."""
+    for engine in engines:
+        if not event.contains(engine, "before_cursor_execute", _count_statement):
+            event.listen(engine, "before_cursor_execute", _count_statement)
+    if STRICT_LOADING and not event.contains(Session, "do_orm_execute", _default_raiseload):
+        event.listen(Session, "do_orm_execute", _default_raiseload)
+
+
+@contextmanager
+def count_queries(budget=None, enforce=True):
+    """Count the statements run inside the block.
+
+    For tests:
+        with count_queries(budget=2) as stats:
+            client.get("/tickets/")
+        assert not stats.repeated()
+    """
+    stats = QueryStats(budget, enforce)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def query_budget(limit: int):
+    """Route dependency declaring how many statements the route may run."""
+    def set_budget():
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.budget = limit
+    return set_budget
+
+
+def report(path: str, stats: QueryStats):
+    """Log budget overruns and likely N+1 patterns for a finished request."""
+    if stats.budget is not None and stats.count > stats.budget:
+        logger.warning(f"{path} ran {stats.count} queries, budget is {stats.budget}")
+    for sql, n in stats.repeated():
+        logger.warning(f"Possible N+1 in {path}: {n}x {sql}")
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
-from .. import models, schemas, auth
-from ..database import get_db
+from .. import models, schemas, auth, archive, market_depth
+from ..buy_requests import fulfilled_clause, is_fulfilled
+from ..events import get_or_create_event
+from ..database import get_db, get_read_db
+from ..query_budget import query_budget
 
 router = APIRouter(
     prefix="/buy-requests",
@@ -20,8 +23,11 @@ def create_buy_request(
     if current_user.role not in ["Buyer", "Both"]:
         raise HTTPException(status_code=403, detail="Only buyers can create buy requests")
     
+    db_event = get_or_create_event(db, request.event_name, request.category, request.event_date)
+
     # Create new buy request
     db_request = models.BuyRequest(
+        event_id=db_event.event_id,
         buyer_id=current_user.user_id,
         event_name=request.event_name,
         category=request.category,
@@ -31,44 +37,40 @@ def create_buy_request(
     )
     
     db.add(db_request)
+    db.flush()
+    # A request the buyer already has a ticket for never shows up as a bid
+    if not is_fulfilled(db, db_request):
+        market_depth.adjust(db, db_event.event_id, market_depth.BID, request.max_price, request.quantity)
     db.commit()
     db.refresh(db_request)
     return db_request
 
-@router.get("/")
+@router.get("/", dependencies=[Depends(query_budget(1))])
 def read_buy_requests(
         skip: int = 0,
         limit: int = 100,
-        db: Session = Depends(get_db)
+        include_past: bool = False,
+        db: Session = Depends(get_read_db)
 ):
-    # Get all buy requests
-    requests = db.query(models.BuyRequest).offset(skip).limit(limit).all()
-
-    # Get all sold tickets
-    sold_tickets = db.query(models.Ticket).filter(models.Ticket.is_sold == True).all()
+    # Get buy requests along with whether each one has been fulfilled
+    query = db.query(models.BuyRequest, fulfilled_clause().label("fulfilled"))
+    if not include_past:
+        query = query.filter(archive.upcoming(models.BuyRequest))
+    rows = query.offset(skip).limit(limit).all()
 
     results = []
-    for request in requests:
-        # Check if any sold ticket fulfills this request
-        matched = any(
-            ticket.buyer_id == request.buyer_id and
-            ticket.event_name == request.event_name and
-            ticket.event_date == request.event_date and
-            ticket.price <= request.max_price
-            for ticket in sold_tickets
-        )
-
-        request_dict = request.__dict__.copy()
-        request_dict["fulfilled"] = matched
+    for request, fulfilled in rows:
+        request_dict = {column.name: getattr(request, column.name) for column in models.BuyRequest.__table__.columns}
+        request_dict["fulfilled"] = fulfilled
         results.append(request_dict)
 
-    print(results)
-
     return results
 
 @router.get("/{request_id}", response_model=schemas.BuyRequest)
-def read_buy_request(request_id: int, db: Session = Depends(get_db)):
+def read_buy_request(request_id: int, db: Session = Depends(get_read_db)):
     db_request = db.query(models.BuyRequest).filter(models.BuyRequest.request_id == request_id).first()
+    if db_request is None:
+        db_request = db.query(models.BuyRequestArchive).filter(models.BuyRequestArchive.request_id == request_id).first()
     if db_request is None:
         raise HTTPException(status_code=404, detail="Buy request not found")
     return db_request
@@ -76,7 +78,7 @@ def read_buy_request(request_id: int, db: Session = Depends(get_db)):
 @router.get("/{request_id}/matches", response_model=List[schemas.SellListing])
 def get_matching_listings(
     request_id: int, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     # Get the buy request
@@ -90,9 +92,9 @@ def get_matching_listings(
     
     # Find matching sell listings
     matching_listings = db.query(models.SellListing).filter(
-        models.SellListing.event_name == db_request.event_name,
+        models.SellListing.event_id == db_request.event_id,
         models.SellListing.price <= db_request.max_price,
-        models.SellListing.event_date == db_request.event_date
+        archive.upcoming(models.SellListing)
     ).all()
     
     return matching_listings
@@ -0,0 +1,115 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List
+from .. import models, schemas, holds, archive, market_depth, price_history, formats
+from ..database import get_read_db
+from ..query_budget import query_budget
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+def _inventory_query(db: Session):
+    """Events joined with their live inventory, one grouped subquery per table"""
+    available = db.query(
+        models.Ticket.event_id,
+        func.count().label("available_tickets")
+    ).filter(
+        models.Ticket.is_sold == False,
+        holds.not_held(datetime.utcnow())
+    ).group_by(models.Ticket.event_id).subquery()
+
+    listings = db.query(
+        models.SellListing.event_id,
+        func.count().label("active_listings")
+    ).filter(models.SellListing.is_available == True).group_by(models.SellListing.event_id).subquery()
+
+    requests = db.query(
+        models.BuyRequest.event_id,
+        func.sum(models.BuyRequest.quantity).label("requested_quantity")
+    ).group_by(models.BuyRequest.event_id).subquery()
+
+    return db.query(
+        models.Event,
+        func.coalesce(available.c.available_tickets, 0),
+        func.coalesce(listings.c.active_listings, 0),
+        func.coalesce(requests.c.requested_quantity, 0)
+    ).outerjoin(available, available.c.event_id == models.Event.event_id) \
+     .outerjoin(listings, listings.c.event_id == models.Event.event_id) \
+     .outerjoin(requests, requests.c.event_id == models.Event.event_id)
+
+
+def _summary(row):
+    db_event, available_tickets, active_listings, requested_quantity = row
+    return {
+        "event_id": db_event.event_id,
+        "name": db_event.name,
+        "category": db_event.category,
+        "event_date": db_event.event_date,
+        "available_tickets": available_tickets,
+        "active_listings": active_listings,
+        "requested_quantity": requested_quantity,
+    }
+
+
+@router.get("/", response_model=List[schemas.EventSummary], dependencies=[Depends(query_budget(1))])
+def read_events(
+    skip: int = 0,
+    limit: int = 100,
+    category: str = None,
+    include_past: bool = False,
+    db: Session = Depends(get_read_db)
+):
+    query = _inventory_query(db)
+    if category:
+        query = query.filter(models.Event.category == category)
+    if not include_past:
+        query = query.filter(archive.upcoming(models.Event))
+    rows = query.order_by(models.Event.event_date, models.Event.event_id).offset(skip).limit(limit).all()
+    return [_summary(row) for row in rows]
+
+
+@router.get("/{event_id}", response_model=schemas.EventSummary)
+def read_event(event_id: int, db: Session = Depends(get_read_db)):
+    row = _inventory_query(db).filter(models.Event.event_id == event_id).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return _summary(row)
+
+
+@router.get("/{event_id}/depth", response_model=schemas.MarketDepth, dependencies=[Depends(query_budget(1))])
+def read_event_depth(event_id: int, db: Session = Depends(get_read_db)):
+    """Unsold tickets per price and requested quantity per max price"""
+    depth = market_depth.get_depth(db, event_id)
+    if depth is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return depth
+
+
+@router.get("/{event_id}/price-history", response_model=List[schemas.PriceBucket])
+def read_event_price_history(
+    event_id: int,
+    resolution: str = "hour",
+    start: datetime = None,
+    end: datetime = None,
+    db: Session = Depends(get_read_db)
+):
+    """Open/high/low/close and volume of sales per minute, hour or day bucket, oldest first.
+
+    Only buckets with at least one sale are returned. The response is streamed,
+    so long ranges don't have to fit in memory.
+    """
+    if resolution not in price_history.RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown resolution: {resolution} (use {', '.join(price_history.RESOLUTIONS)})"
+        )
+    if db.get(models.Event, event_id) is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return StreamingResponse(price_history.stream(event_id, resolution, start, end), media_type=formats.JSON)
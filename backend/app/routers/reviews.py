@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from .. import models, schemas, auth
-from ..database import get_db
+from ..database import get_db, get_read_db
+from ..query_budget import query_budget
 
 router = APIRouter(
     prefix="/reviews",
@@ -50,21 +51,21 @@ def create_review(
     db.refresh(db_review)
     return db_review
 
-@router.get("/", response_model=List[schemas.Review])
+@router.get("/", response_model=List[schemas.Review], dependencies=[Depends(query_budget(1))])
 def read_reviews(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     reviews = db.query(models.Review).offset(skip).limit(limit).all()
     return reviews
 
-@router.get("/seller/{seller_id}", response_model=List[schemas.Review])
+@router.get("/seller/{seller_id}", response_model=List[schemas.Review], dependencies=[Depends(query_budget(1))])
 def read_seller_reviews(
     seller_id: int,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     reviews = db.query(models.Review).filter(
         models.Review.seller_id == seller_id
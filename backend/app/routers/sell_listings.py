@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas, auth
-from ..database import get_db
+from typing import List, Optional
+from .. import models, schemas, auth, archive, formats, market_depth, fieldsets
+from ..events import get_or_create_event
+from ..database import get_db, get_read_db
+from ..query_budget import query_budget
 
 router = APIRouter(
     prefix="/sell-listings",
@@ -22,8 +24,11 @@ def create_sell_listing(
     if current_user.role not in ["Seller", "Both"]:
         raise HTTPException(status_code=403, detail="Only sellers can create sell listings")
 
+    db_event = get_or_create_event(db, listing.event_name, listing.category, listing.event_date)
+
     # Create new sell listing
     db_listing = models.SellListing(
+        event_id=db_event.event_id,
         seller_id=current_user.user_id,
         event_name=listing.event_name,
         category=listing.category,
@@ -39,6 +44,7 @@ def create_sell_listing(
     # Create tickets for the listing
     for _ in range(listing.quantity):
         db_ticket = models.Ticket(
+            event_id=db_event.event_id,
             event_name=listing.event_name,
             category=listing.category,
             event_date=listing.event_date,
@@ -47,31 +53,43 @@ def create_sell_listing(
             is_sold=False
         )
         db.add(db_ticket)
-
+    market_depth.adjust(db, db_event.event_id, market_depth.ASK, listing.price, listing.quantity)
 
     db.commit()
 
     # Check for matching buy requests
     matching_requests = db.query(models.BuyRequest).filter(
-        models.BuyRequest.event_name == listing.event_name,
-        models.BuyRequest.max_price >= listing.price,
-        models.BuyRequest.event_date == listing.event_date
+        models.BuyRequest.event_id == db_event.event_id,
+        models.BuyRequest.max_price >= listing.price
     ).all()
 
     # Return the listing with any matches
     return db_listing
-@router.get("/", response_model=List[schemas.SellListing])
+@router.get("/", response_model=List[schemas.SellListing], dependencies=[Depends(query_budget(3))])
 def read_sell_listings(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db)
+    include_past: bool = False,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    listings = db.query(models.SellListing).offset(skip).limit(limit).all()
-    return listings
+    """Sell listings; the Accept header selects JSON rows, columnar JSON, MessagePack or Arrow.
+    fields= narrows the columns and include=seller,event embeds related objects"""
+    columns, relations = fieldsets.select_columns(models.SellListing, schemas.SellListing, fields, include)
+    query = db.query(*columns)
+    if not include_past:
+        query = query.filter(archive.upcoming(models.SellListing))
+    rows = query.offset(skip).limit(limit).all()
+    columns, rows = fieldsets.embed(db, columns, rows, relations)
+    return formats.render(request, columns, rows)
 
 @router.get("/{listing_id}", response_model=schemas.SellListing)
-def read_sell_listing(listing_id: int, db: Session = Depends(get_db)):
+def read_sell_listing(listing_id: int, db: Session = Depends(get_read_db)):
     db_listing = db.query(models.SellListing).filter(models.SellListing.sell_id == listing_id).first()
+    if db_listing is None:
+        db_listing = db.query(models.SellListingArchive).filter(models.SellListingArchive.sell_id == listing_id).first()
     if db_listing is None:
         raise HTTPException(status_code=404, detail="Sell listing not found")
     return db_listing
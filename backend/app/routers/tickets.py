@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from typing import List
-from .. import models, schemas, auth
-from ..database import get_db
+from typing import List, Optional
+from .. import models, schemas, auth, holds, archive, formats, market_depth, checkout, group_commit, fieldsets
+from ..events import get_or_create_event, find_event_id
+from ..database import get_db, get_read_db
+from ..query_budget import query_budget
 # from fastapi import Body
 # from typing import Optional
 router = APIRouter(
@@ -21,8 +24,11 @@ def create_ticket(
     if current_user.role not in ["Seller", "Both"]:
         raise HTTPException(status_code=403, detail="Only sellers can create tickets")
     
+    db_event = get_or_create_event(db, ticket.event_name, ticket.category, ticket.event_date)
+
     # Create new ticket
     db_ticket = models.Ticket(
+        event_id=db_event.event_id,
         event_name=ticket.event_name,
         category=ticket.category,
         event_date=ticket.event_date,
@@ -31,41 +37,51 @@ def create_ticket(
     )
     
     db.add(db_ticket)
+    market_depth.adjust(db, db_event.event_id, market_depth.ASK, ticket.price, 1)
     db.commit()
     db.refresh(db_ticket)
     return db_ticket
 
-@router.get("/", response_model=List[schemas.Ticket])
+@router.get("/", response_model=List[schemas.Ticket], dependencies=[Depends(query_budget(3))])
 def read_tickets(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db)
+    include_past: bool = False,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    tickets = db.query(models.Ticket).filter(models.Ticket.is_sold == False).offset(skip).limit(limit).all()
-    return tickets
+    """Unsold tickets; the Accept header selects JSON rows, columnar JSON, MessagePack or Arrow.
+    fields= narrows the columns and include=seller,event embeds related objects"""
+    columns, relations = fieldsets.select_columns(models.Ticket, schemas.Ticket, fields, include)
+    query = db.query(*columns).filter(
+        models.Ticket.is_sold == False,
+        holds.not_held(datetime.utcnow())
+    )
+    if not include_past:
+        query = query.filter(archive.upcoming(models.Ticket))
+    rows = query.offset(skip).limit(limit).all()
+    columns, rows = fieldsets.embed(db, columns, rows, relations)
+    return formats.render(request, columns, rows)
 
 @router.get("/{ticket_id}", response_model=schemas.Ticket)
-def read_ticket(ticket_id: int, db: Session = Depends(get_db)):
+def read_ticket(ticket_id: int, db: Session = Depends(get_read_db)):
     db_ticket = db.query(models.Ticket).filter(models.Ticket.ticket_id == ticket_id).first()
+    if db_ticket is None:
+        # Tickets for past events live in the archive
+        db_ticket = db.query(models.TicketArchive).filter(models.TicketArchive.ticket_id == ticket_id).first()
     if db_ticket is None:
         raise HTTPException(status_code=404, detail="Ticket not found")
     return db_ticket
 
 
-@router.get("/user/{user_id}", response_model=List[schemas.Ticket])
-def get_user_tickets(user_id: int, db: Session = Depends(get_db)):
+@router.get("/user/{user_id}", response_model=List[schemas.Ticket], dependencies=[Depends(query_budget(2))])
+def get_user_tickets(user_id: int, db: Session = Depends(get_read_db)):
     """Get all tickets purchased by a specific user"""
-    # Print for debugging
-    print(f"Fetching tickets for user ID: {user_id}")
-
     # Query tickets with the specified buyer_id
     tickets = db.query(models.Ticket).filter(models.Ticket.buyer_id == user_id).all()
-
-    # Print results for debugging
-    print(f"Found {len(tickets)} tickets for user {user_id}")
-    for ticket in tickets:
-        print(f"Ticket {ticket.ticket_id}: buyer_id={ticket.buyer_id}, is_sold={ticket.is_sold}")
-
+    tickets += db.query(models.TicketArchive).filter(models.TicketArchive.buyer_id == user_id).all()
     return tickets
 
 
@@ -80,42 +96,79 @@ def buy_ticket(
     if current_user.role not in ["Buyer", "Both"]:
         raise HTTPException(status_code=403, detail="Only buyers can purchase tickets")
 
-    # Get the ticket
-    db_ticket = db.query(models.Ticket).filter(models.Ticket.ticket_id == ticket_id).first()
-    if db_ticket is None:
-        raise HTTPException(status_code=404, detail="Ticket not found")
-
-    # Check if ticket is already sold
-    if db_ticket.is_sold:
-        raise HTTPException(status_code=400, detail="Ticket is already sold")
+    # With group commit on, concurrent checkouts share one transaction
+    writer = group_commit.writer
+    if writer is not None:
+        return writer.run(checkout.buy_ticket, ticket_id, current_user.user_id)
 
-    # Update ticket
-    db_ticket.buyer_id = current_user.user_id
-    db_ticket.is_sold = True
+    db_ticket = checkout.buy_ticket(db, ticket_id, current_user.user_id)
+    db.commit()
+    db.refresh(db_ticket)
+    return db_ticket
 
-    # if matched_request_id: ## ADDED 4
-    #     db_request = db.query(models.BuyRequest).filter(models.BuyRequest.request_id == matched_request_id).first()
-    #     if db_request:
-    #         db_request.fulfilled = True
-    #         db.commit()
 
-    # Create transaction
-    db_transaction = models.Transaction(
-        ticket_id=db_ticket.ticket_id,
-        seller_id=db_ticket.seller_id,
-        buyer_id=current_user.user_id,
-        price=db_ticket.price,
-        payment_method="Credit Card"  # Default payment method
+@router.post("/holds", response_model=schemas.TicketHold, status_code=status.HTTP_201_CREATED)
+def hold_tickets(
+        hold: schemas.TicketHoldCreate,
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(auth.get_current_user)
+):
+    """Reserve N seats for an event for a limited time"""
+    if current_user.role not in ["Buyer", "Both"]:
+        raise HTTPException(status_code=403, detail="Only buyers can hold tickets")
+
+    now = datetime.utcnow()
+    event_id = find_event_id(db, hold.event_name, hold.event_date)
+    if event_id is None:
+        raise HTTPException(status_code=409, detail="Not enough seats available")
+
+    # Pick candidate seats, cheapest first
+    query = db.query(models.Ticket.ticket_id).filter(
+        models.Ticket.event_id == event_id,
+        archive.upcoming(models.Ticket),
+        models.Ticket.is_sold == False,
+        holds.not_held(now)
+    )
+    if hold.max_price is not None:
+        query = query.filter(models.Ticket.price <= hold.max_price)
+    ticket_ids = [row.ticket_id for row in query.order_by(models.Ticket.price).limit(hold.quantity).all()]
+
+    # Claim them in a single conditional update; all or nothing
+    if len(ticket_ids) < hold.quantity or holds.hold_tickets(db, ticket_ids, current_user.user_id, now) < hold.quantity:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Not enough seats available")
+    db.commit()
 
+    held = db.query(models.Ticket).filter(models.Ticket.ticket_id.in_(ticket_ids)).all()
+    return {"tickets": held, "hold_expires_at": now + holds.HOLD_DURATION}
 
 
-    )
+@router.post("/holds/confirm", response_model=List[schemas.Ticket])
+def confirm_holds(
+        hold: schemas.TicketHoldUpdate,
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(auth.get_current_user)
+):
+    """Buy the seats the current user is holding"""
+    # With group commit on, confirms share the writer's transaction like checkouts
+    writer = group_commit.writer
+    if writer is not None:
+        return writer.run(checkout.confirm_holds, current_user.user_id, hold.ticket_ids)
 
-    db.add(db_transaction)
+    held = checkout.confirm_holds(db, current_user.user_id, hold.ticket_ids)
     db.commit()
-    db.refresh(db_ticket)
-    return db_ticket
-
+    for db_ticket in held:
+        db.refresh(db_ticket)
+    return held
 
 
+@router.post("/holds/release", status_code=status.HTTP_204_NO_CONTENT)
+def release_holds(
+        hold: schemas.TicketHoldUpdate,
+        db: Session = Depends(get_db),
+        current_user: models.User = Depends(auth.get_current_user)
+):
+    """Give held seats back before the hold expires"""
+    holds.release_holds(db, current_user.user_id, hold.ticket_ids)
+    db.commit()
 
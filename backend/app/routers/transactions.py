@@ -10,13 +10,15 @@
 
 
 from fastapi import APIRouter, Depends
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from .. import models, database, schemas
+from ..query_budget import query_budget
 
 router = APIRouter()
 
-@router.get("/transactions", response_model=list[schemas.Transaction])
-def get_all_transactions(db: Session = Depends(database.get_db)):
+@router.get("/transactions", response_model=list[schemas.Transaction], dependencies=[Depends(query_budget(1))])
+def get_all_transactions(db: Session = Depends(database.get_read_db)):
     results = (
         db.query(
             models.Transaction.transaction_id,
@@ -25,9 +27,12 @@ def get_all_transactions(db: Session = Depends(database.get_db)):
             models.Transaction.ticket_id,
             models.Transaction.price,
             models.Transaction.transaction_date,
-            models.Ticket.event_name
+            # Tickets for past events have been moved to the archive
+            func.coalesce(models.Ticket.event_name, models.TicketArchive.event_name)
         )
-        .join(models.Ticket, models.Transaction.ticket_id == models.Ticket.ticket_id)
+        .outerjoin(models.Ticket, models.Transaction.ticket_id == models.Ticket.ticket_id)
+        .outerjoin(models.TicketArchive, models.Transaction.ticket_id == models.TicketArchive.ticket_id)
+        .filter((models.Ticket.ticket_id != None) | (models.TicketArchive.ticket_id != None))
         .all()
     )
 
@@ -1,10 +1,13 @@
 import logging
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import DateTime, cast, func, null, select, union_all
 from sqlalchemy.orm import Session
 from typing import List
-from .. import models, schemas, auth
-from ..database import get_db
+from .. import models, schemas, auth, archive
+from ..buy_requests import fulfilled_clause
+from ..database import get_db, get_read_db
+from ..query_budget import query_budget
 
 logger = logging.getLogger(__name__)
 
@@ -39,18 +42,112 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 @router.get("/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     users = db.query(models.User).offset(skip).limit(limit).all()
     return users
 
 @router.get("/{user_id}", response_model=schemas.User)
-def read_user(user_id: int, db: Session = Depends(get_db)):
+def read_user(user_id: int, db: Session = Depends(get_read_db)):
     db_user = db.query(models.User).filter(models.User.user_id == user_id).first()
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 
+
+@router.get("/{user_id}/dashboard", response_model=schemas.Dashboard, dependencies=[Depends(query_budget(4))])
+def read_user_dashboard(
+    user_id: int,
+    purchased_skip: int = 0,
+    listings_skip: int = 0,
+    requests_skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Everything the dashboard shows, in four queries no matter how much the user has"""
+    # Totals and sales figures in one round of scalar subqueries
+    Ticket, TicketArchive = models.Ticket, models.TicketArchive
+    totals = db.execute(select(
+        select(models.User.user_id).where(models.User.user_id == user_id).scalar_subquery(),
+        select(func.count()).select_from(Ticket).where(Ticket.buyer_id == user_id).scalar_subquery()
+        + select(func.count()).select_from(TicketArchive).where(TicketArchive.buyer_id == user_id).scalar_subquery(),
+        select(func.count()).select_from(models.SellListing).where(
+            models.SellListing.seller_id == user_id,
+            models.SellListing.is_available == True,
+            archive.upcoming(models.SellListing)
+        ).scalar_subquery(),
+        select(func.count()).select_from(models.BuyRequest).where(
+            models.BuyRequest.buyer_id == user_id,
+            archive.upcoming(models.BuyRequest)
+        ).scalar_subquery(),
+        select(func.count()).select_from(models.Transaction).where(models.Transaction.seller_id == user_id).scalar_subquery(),
+        select(func.coalesce(func.sum(models.Transaction.price), 0)).where(models.Transaction.seller_id == user_id).scalar_subquery(),
+    )).one()
+    found, purchased_total, listings_total, requests_total, tickets_sold, revenue = totals
+    if found is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Purchased tickets, including ones for past events that were archived
+    purchased = union_all(
+        select(Ticket.event_name, Ticket.category, Ticket.event_date, Ticket.price, Ticket.ticket_id,
+               Ticket.seller_id, Ticket.buyer_id, Ticket.is_sold, Ticket.hold_expires_at, Ticket.event_id)
+        .where(Ticket.buyer_id == user_id),
+        select(TicketArchive.event_name, TicketArchive.category, TicketArchive.event_date, TicketArchive.price,
+               TicketArchive.ticket_id, TicketArchive.seller_id, TicketArchive.buyer_id, TicketArchive.is_sold,
+               cast(null(), DateTime).label("hold_expires_at"), TicketArchive.event_id)
+        .where(TicketArchive.buyer_id == user_id)
+    ).subquery()
+    purchased_tickets = db.execute(
+        select(purchased).order_by(purchased.c.event_date.desc(), purchased.c.ticket_id.desc())
+        .offset(purchased_skip).limit(limit)
+    ).mappings().all()
+
+    # Active listings with the seats still unsold at the listing's price
+    remaining = select(
+        Ticket.event_id,
+        Ticket.price,
+        func.count().label("remaining_seats")
+    ).where(
+        Ticket.seller_id == user_id,
+        Ticket.is_sold == False
+    ).group_by(Ticket.event_id, Ticket.price).subquery()
+    listings = db.query(
+        models.SellListing,
+        func.coalesce(remaining.c.remaining_seats, 0)
+    ).outerjoin(remaining, (remaining.c.event_id == models.SellListing.event_id)
+                & (remaining.c.price == models.SellListing.price)) \
+     .filter(
+        models.SellListing.seller_id == user_id,
+        models.SellListing.is_available == True,
+        archive.upcoming(models.SellListing)
+    ).order_by(models.SellListing.event_date, models.SellListing.sell_id) \
+     .offset(listings_skip).limit(limit).all()
+
+    # Buy requests with their fulfilled state
+    requests = db.query(models.BuyRequest, fulfilled_clause().label("fulfilled")).filter(
+        models.BuyRequest.buyer_id == user_id,
+        archive.upcoming(models.BuyRequest)
+    ).order_by(models.BuyRequest.event_date, models.BuyRequest.request_id) \
+     .offset(requests_skip).limit(limit).all()
+
+    return {
+        "user_id": user_id,
+        "purchased_tickets": purchased_tickets,
+        "purchased_total": purchased_total,
+        "active_listings": [
+            dict(schemas.SellListing.from_orm(listing).dict(), remaining_seats=remaining_seats)
+            for listing, remaining_seats in listings
+        ],
+        "listings_total": listings_total,
+        "buy_requests": [
+            dict(schemas.BuyRequest.from_orm(request).dict(), fulfilled=fulfilled)
+            for request, fulfilled in requests
+        ],
+        "requests_total": requests_total,
+        "sales": {"tickets_sold": tickets_sold, "revenue": revenue},
+    }
+
+
 @router.post("/login")
 def login(user_data: schemas.UserLogin, db: Session = Depends(get_db)):
     logger.info(f"Login attempt for email: {user_data.email}")
@@ -50,10 +50,26 @@ class Ticket(TicketBase):
     seller_id: int
     buyer_id: Optional[int] = None
     is_sold: bool = False
+    hold_expires_at: Optional[datetime] = None
+    event_id: Optional[int] = None
 
     class Config:
         orm_mode = True
 
+# Ticket hold schemas
+class TicketHoldCreate(BaseModel):
+    event_name: str
+    event_date: date
+    quantity: int = Field(..., gt=0)
+    max_price: Optional[float] = None
+
+class TicketHoldUpdate(BaseModel):
+    ticket_ids: Optional[List[int]] = None  # Defaults to all of the user's holds
+
+class TicketHold(BaseModel):
+    tickets: List[Ticket]
+    hold_expires_at: datetime
+
 # Transaction schemas
 class TransactionBase(BaseModel):
     ticket_id: int
@@ -127,6 +143,7 @@ class SellListing(SellListingBase):
     sell_id: int
     seller_id: int
     created_date: datetime
+    event_id: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -152,10 +169,64 @@ class BuyRequest(BuyRequestBase):
     request_id: int
     buyer_id: int
     created_date: datetime
+    event_id: Optional[int] = None
+
+    class Config:
+        orm_mode = True
+
+# Event schemas
+class Event(BaseModel):
+    event_id: int
+    name: str
+    category: str
+    event_date: date
 
     class Config:
         orm_mode = True
 
+class EventSummary(Event):
+    available_tickets: int = 0
+    active_listings: int = 0
+    requested_quantity: int = 0
+
+class PriceLevel(BaseModel):
+    price: float
+    quantity: int
+
+class MarketDepth(BaseModel):
+    event_id: int
+    asks: List[PriceLevel]  # Unsold tickets, cheapest first
+    bids: List[PriceLevel]  # Buy request demand, highest max_price first
+
+class PriceBucket(BaseModel):
+    bucket_start: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+
+# Dashboard schemas
+class DashboardListing(SellListing):
+    remaining_seats: int
+
+class DashboardBuyRequest(BuyRequest):
+    fulfilled: bool
+
+class SalesTotals(BaseModel):
+    tickets_sold: int
+    revenue: float
+
+class Dashboard(BaseModel):
+    user_id: int
+    purchased_tickets: List[Ticket]
+    purchased_total: int
+    active_listings: List[DashboardListing]
+    listings_total: int
+    buy_requests: List[DashboardBuyRequest]
+    requests_total: int
+    sales: SalesTotals
+
 # Match notification schema
 class MatchNotification(BaseModel):
     buy_request: BuyRequest
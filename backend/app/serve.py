@@ -0,0 +1,31 @@
+"""Run the API on several worker processes.
+
+    python -m app.serve --workers 4
+
+Single-process development still works with `uvicorn app.main:app --reload`.
+Schema setup runs once here, before the workers start, so they don't race
+each other on migrations. Workers keep their in-process caches fresh
+through app/invalidation.py.
+"""
+import argparse
+import os
+import uvicorn
+from .startup import prepare_schema
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the TicketMarket API on multiple workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    prepare_schema()
+
+    # Workers import app.main; tell them the schema is already in place
+    os.environ["SKIP_MIGRATIONS"] = "1"
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
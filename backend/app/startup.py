@@ -0,0 +1,71 @@
+import logging
+import time
+from sqlalchemy import desc, func, inspect, select, text
+from . import market_depth, models, invalidation
+from .config import Settings
+from .database import ReadSessionLocal, engine, read_engine
+from .migrations import run_migrations
+
+logger = logging.getLogger(__name__)
+
+
+def prepare_schema():
+    """Create missing tables and run migrations."""
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+
+def check_schema():
+    """Fail fast if someone else was supposed to prepare the schema and didn't."""
+    inspector = inspect(engine)
+    missing = [table for table in models.Base.metadata.tables if not inspector.has_table(table)]
+    if missing:
+        raise RuntimeError(f"Database is missing tables: {', '.join(sorted(missing))}")
+
+
+def warm_pool(connections: int):
+    """Open connections up front so the first requests don't pay for them."""
+    for pool_engine in {engine, read_engine}:
+        opened = [pool_engine.connect() for _ in range(connections)]
+        for connection in opened:
+            connection.execute(text("SELECT 1"))
+            connection.close()
+
+
+def preload_order_books(count: int):
+    """Cache market depth for the events with the most unsold tickets."""
+    if count <= 0:
+        return
+    levels = models.PriceLevel
+    db = ReadSessionLocal()
+    try:
+        event_ids = db.execute(
+            select(levels.event_id)
+            .where(levels.side == market_depth.ASK)
+            .group_by(levels.event_id)
+            .order_by(desc(func.sum(levels.quantity)))
+            .limit(count)
+        ).scalars().all()
+        for event_id in event_ids:
+            market_depth.get_depth(db, event_id)
+    finally:
+        db.close()
+
+
+def warm_up(settings: Settings):
+    """Run every startup step and return how long each took, in seconds."""
+    steps = [
+        ("schema", prepare_schema if settings.run_migrations else check_schema),
+        ("pool", lambda: warm_pool(settings.warm_connections)),
+        # Before any cache is filled, so writes from other workers during
+        # warm-up are picked up by the first background poll
+        ("changes", invalidation.poll_once),
+        ("order_books", lambda: preload_order_books(settings.preload_order_books)),
+    ]
+    timings = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        step()
+        timings[name] = round(time.perf_counter() - start, 4)
+    logger.info(f"Startup steps: {timings}")
+    return timings
@@ -0,0 +1,67 @@
+"""Payload size and encode time of the catalog response formats.
+
+    cd backend && python -m benchmarks.bench_formats --rows 10000
+
+Encodes a synthetic /tickets/ page in every available format, with and
+without compression, and prints bytes and milliseconds per encode.
+"""
+import argparse
+import gzip
+import time
+from datetime import date, datetime, timedelta
+from app import formats, models, schemas
+
+
+def make_rows(count):
+    today = date.today()
+    rows = []
+    for i in range(count):
+        sold = i % 3 == 0
+        rows.append((
+            f"Event {i % 50}",
+            ["Concert", "Sports", "Theater", "Other"][i % 4],
+            today + timedelta(days=i % 90),
+            round(20 + (i % 200) * 1.5, 2),
+            i + 1,
+            i % 400 + 1,
+            i % 900 + 1 if sold else None,
+            sold,
+            datetime.utcnow() if i % 17 == 0 else None,
+            i % 50 + 1,
+        ))
+    return rows
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    columns = formats.columns_for(models.Ticket, schemas.Ticket)
+    rows = make_rows(args.rows)
+
+    print(f"{args.rows} ticket rows")
+    print(f"{'format':45} {'bytes':>10} {'encode ms':>10} {'gzip bytes':>11} {'gzip ms':>8} {'br bytes':>9} {'br ms':>7}")
+    for media_type, encoder in formats.ENCODERS.items():
+        if encoder is None:
+            print(f"{media_type:45} (not installed)")
+            continue
+        body, encode_ms = timed(lambda: encoder(columns, rows), args.repeat)
+        gzipped, gzip_ms = timed(lambda: gzip.compress(body, compresslevel=6), args.repeat)
+        line = f"{media_type:45} {len(body):>10} {encode_ms:>10.1f} {len(gzipped):>11} {gzip_ms:>8.1f}"
+        if formats.brotli:
+            brotlied, br_ms = timed(lambda: formats.brotli.compress(body, quality=4), args.repeat)
+            line += f" {len(brotlied):>9} {br_ms:>7.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
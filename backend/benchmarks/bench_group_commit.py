@@ -0,0 +1,114 @@
+"""Checkouts/sec and latency with and without group commit.
+
+    cd backend && python -m benchmarks.bench_group_commit --clients 32 --checkouts 4000
+
+Runs against a throwaway SQLite file. Each client thread buys distinct
+tickets through app.checkout.buy_ticket, either committing on its own
+(window 0) or through a GroupCommitWriter with the given window.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+
+from app import checkout, group_commit, models  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+
+
+def seed(ticket_count):
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    db = SessionLocal()
+    seller = models.User(username="seller", email="seller@example.com", password="x", role="Seller")
+    buyer = models.User(username="buyer", email="buyer@example.com", password="x", role="Buyer")
+    event = models.Event(name="Bench", category="Concert", event_date=date.today() + timedelta(days=30))
+    db.add_all([seller, buyer, event])
+    db.flush()
+    db.bulk_save_objects([
+        models.Ticket(event_name="Bench", category="Concert", event_date=event.event_date, price=50,
+                      seller_id=seller.user_id, event_id=event.event_id)
+        for _ in range(ticket_count)
+    ])
+    db.commit()
+    buyer_id = buyer.user_id
+    ticket_ids = [row[0] for row in db.query(models.Ticket.ticket_id).all()]
+    db.close()
+    return buyer_id, ticket_ids
+
+
+def direct_checkout(ticket_id, buyer_id):
+    db = SessionLocal()
+    try:
+        checkout.buy_ticket(db, ticket_id, buyer_id)
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(window_ms, clients, ticket_ids, buyer_id):
+    writer = None
+    if window_ms > 0:
+        writer = group_commit.GroupCommitWriter(window_ms=window_ms)
+        writer.start()
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    chunks = [ticket_ids[i::clients] for i in range(clients)]
+
+    def client(chunk):
+        for ticket_id in chunk:
+            start = time.perf_counter()
+            try:
+                if writer:
+                    writer.submit(checkout.buy_ticket, ticket_id, buyer_id).result()
+                else:
+                    direct_checkout(ticket_id, buyer_id)
+            except Exception as error:
+                with lock:
+                    errors.append(error)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(chunk,)) for chunk in chunks]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if writer:
+        writer.stop()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    return len(latencies) / elapsed, statistics.median(latencies) * 1000, p99, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--checkouts", type=int, default=4000, help="per window size")
+    parser.add_argument("--windows", default="0,1,2,5", help="comma-separated window sizes in ms; 0 = no group commit")
+    args = parser.parse_args()
+
+    windows = [float(w) for w in args.windows.split(",")]
+    buyer_id, ticket_ids = seed(args.checkouts * len(windows))
+
+    print(f"{args.clients} concurrent clients, {args.checkouts} checkouts per run, SQLite at {_db_dir}")
+    print(f"{'window ms':>9} {'checkouts/s':>12} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for i, window in enumerate(windows):
+        chunk = ticket_ids[i * args.checkouts:(i + 1) * args.checkouts]
+        throughput, p50, p99, errors = run(window, args.clients, chunk, buyer_id)
+        print(f"{window:>9g} {throughput:>12.0f} {p50:>8.1f} {p99:>8.1f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
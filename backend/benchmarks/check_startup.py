@@ -0,0 +1,54 @@
+"""Fail if importing and starting the API takes longer than the budget.
+
+    cd backend && python -m benchmarks.check_startup --budget 2.0
+
+Imports app.main in this fresh interpreter against a throwaway SQLite
+file, runs the lifespan startup, polls /ready and exits non-zero when
+import plus warm-up exceeds the budget. Suitable as a CI step.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/startup.db")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0")),
+                        help="seconds allowed for import plus startup")
+    args = parser.parse_args()
+
+    from fastapi.testclient import TestClient
+
+    start = time.perf_counter()
+    from app.main import app
+    import_seconds = time.perf_counter() - start
+
+    client = TestClient(app)
+    if client.get("/ready").status_code != 503:
+        print("/ready reported ready before startup ran")
+        return 1
+
+    with client:
+        response = client.get("/ready")
+        total = time.perf_counter() - start
+        if response.status_code != 200:
+            print(f"/ready returned {response.status_code} after startup")
+            return 1
+        steps = response.json()["steps"]
+
+    print(f"import {import_seconds:.3f}s, total {total:.3f}s, budget {args.budget:.3f}s")
+    for name, seconds in steps.items():
+        print(f"  {name:<12} {seconds:.3f}s")
+    if total > args.budget:
+        print("over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,12 @@
 "use client"
 
 import { useState, useEffect } from "react"
-import { Container, Typography, Box, Grid, Paper, Tabs, Tab, Chip } from "@mui/material"
+import { Container, Typography, Box, Grid, Paper, Tabs, Tab, Chip, Button } from "@mui/material"
 import { useAuth } from "../context/AuthContext"
-import { getSellListings, getBuyRequests, getUserTickets, getTickets } from "../services/api"
+import { getUserDashboard } from "../services/api"
+
+// Items fetched per section per request
+const PAGE_SIZE = 20
 
 const DashboardPage = () => {
   const { user } = useAuth()
@@ -11,41 +14,33 @@ const DashboardPage = () => {
   const [sellListings, setSellListings] = useState([])
   const [buyRequests, setBuyRequests] = useState([])
   const [tickets, setTickets] = useState([])
-  const [allTickets, setAllTickets] = useState([]) // All tickets for availability calculation
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
   const [refreshKey, setRefreshKey] = useState(0) // Used to force refresh
   const [fulfilledRequests, setFulfilledRequests] = useState([]) // IDs of fulfilled requests
+  const [totals, setTotals] = useState({ listings: 0, requests: 0, tickets: 0 })
+  const [loadingMore, setLoadingMore] = useState(false)
+
+  const applyTotals = (data) => {
+    setTotals({ listings: data.listings_total, requests: data.requests_total, tickets: data.purchased_total })
+  }
 
   const fetchData = async () => {
     try {
       setLoading(true)
       setError(null)
 
-      // Fetch all tickets to calculate availability
-      const allTicketsResponse = await getTickets()
-      setAllTickets(allTicketsResponse.data)
+      // One request returns listings, requests and purchased tickets for this user
+      const { data } = await getUserDashboard(user.user_id, { limit: PAGE_SIZE })
+      applyTotals(data)
 
-      // Fetch data based on user role
       if (user.role === "Seller" || user.role === "Both") {
-        const sellResponse = await getSellListings()
-        setSellListings(sellResponse.data.filter((listing) => listing.seller_id === user.user_id))
+        setSellListings(data.active_listings)
       }
 
       if (user.role === "Buyer" || user.role === "Both") {
-        const buyResponse = await getBuyRequests()
-        setBuyRequests(buyResponse.data.filter((request) => request.buyer_id === user.user_id))
-
-        // Use the dedicated endpoint to get user's tickets
-        try {
-          console.log("Fetching tickets for user ID:", user.user_id)
-          const userTicketsResponse = await getUserTickets(user.user_id)
-          console.log("User tickets from API:", userTicketsResponse.data)
-          setTickets(userTicketsResponse.data)
-        } catch (ticketError) {
-          console.error("Error fetching user tickets:", ticketError)
-          setError("Failed to load purchased tickets. Please try again.")
-        }
+        setBuyRequests(data.buy_requests)
+        setTickets(data.purchased_tickets)
       }
     } catch (error) {
       console.error("Error fetching dashboard data:", error)
@@ -55,6 +50,41 @@ const DashboardPage = () => {
     }
   }
 
+  // Fetch the next page of one section and append it
+  const loadMore = async (section) => {
+    try {
+      setLoadingMore(true)
+      const { data } = await getUserDashboard(user.user_id, {
+        limit: PAGE_SIZE,
+        listings_skip: sellListings.length,
+        requests_skip: buyRequests.length,
+        purchased_skip: tickets.length,
+      })
+      applyTotals(data)
+      if (section === "listings") {
+        setSellListings((prev) => [...prev, ...data.active_listings])
+      } else if (section === "requests") {
+        setBuyRequests((prev) => [...prev, ...data.buy_requests])
+      } else {
+        setTickets((prev) => [...prev, ...data.purchased_tickets])
+      }
+    } catch (error) {
+      console.error("Error fetching more dashboard data:", error)
+      setError("Failed to load more items. Please try again.")
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  const renderLoadMore = (section, shown, total) =>
+    shown < total && (
+      <Grid item xs={12} sx={{ textAlign: "center" }}>
+        <Button variant="outlined" onClick={() => loadMore(section)} disabled={loadingMore}>
+          {loadingMore ? "טוען..." : `טען עוד (${shown} מתוך ${total})`}
+        </Button>
+      </Grid>
+    )
+
   useEffect(() => {
     if (user) {
       fetchData()
@@ -82,60 +112,8 @@ const DashboardPage = () => {
     }
   }, [])
 
-  // Load fulfilled requests from localStorage on component mount
-  useEffect(() => {
-    // Get the buy request matches from localStorage
-    const buyRequestMatches = JSON.parse(localStorage.getItem("buyRequestMatches") || "[]")
-
-    // Check if any of the user's tickets match the criteria for a buy request
-    const newFulfilledRequests = []
-
-    buyRequestMatches.forEach((matchInfo) => {
-      // Only consider requests created by the current user
-      const matchingRequest = buyRequests.find((req) => req.request_id === matchInfo.requestId)
-      if (!matchingRequest) return
-
-      // Check if the user has purchased any of the matching tickets
-      const hasMatchingPurchase = tickets.some((ticket) =>
-        matchInfo.matches.some(
-          (match) =>
-            ticket.event_name === match.eventName &&
-            new Date(ticket.event_date).toISOString().split("T")[0] ===
-              new Date(match.eventDate).toISOString().split("T")[0] &&
-            Math.abs(ticket.price - match.price) < 0.01 &&
-            ticket.is_sold &&
-            ticket.buyer_id === user.user_id,
-        ),
-      )
-
-      if (hasMatchingPurchase) {
-        newFulfilledRequests.push(matchInfo.requestId)
-      }
-    })
-
-    if (newFulfilledRequests.length > 0) {
-      setFulfilledRequests((prev) => [...prev, ...newFulfilledRequests])
-    }
-  }, [buyRequests, tickets, user])
-
-  // Calculate remaining quantity for each listing
-  const getAvailableQuantity = (listing) => {
-    // Find all tickets that match this listing
-    const matchingTickets = allTickets.filter(
-      (ticket) =>
-        ticket.event_name === listing.event_name &&
-        ticket.seller_id === listing.seller_id &&
-        new Date(ticket.event_date).toISOString().split("T")[0] ===
-          new Date(listing.event_date).toISOString().split("T")[0] &&
-        Math.abs(ticket.price - listing.price) < 0.01, // Compare prices with a small tolerance
-    )
-
-    // Count unsold tickets
-    const availableTickets = matchingTickets.filter((ticket) => !ticket.is_sold).length
-
-    // Return the available count
-    return availableTickets
-  }
+  // Remaining seats are computed by the server
+  const getAvailableQuantity = (listing) => listing.remaining_seats
 
   const handleTabChange = (event, newValue) => {
     setTabValue(newValue)
@@ -245,6 +223,7 @@ const DashboardPage = () => {
                 ) : (
                   <Typography>אין לך פרסומים פעילים.</Typography>
                 )}
+                {renderLoadMore("listings", sellListings.length, totals.listings)}
               </Grid>
             )}
 
@@ -253,7 +232,7 @@ const DashboardPage = () => {
               <Grid container spacing={2}>
                 {buyRequests.length > 0 ? (
                   buyRequests.map((request) => {
-                    const isFulfilled = fulfilledRequests.includes(request.request_id)
+                    const isFulfilled = request.fulfilled || fulfilledRequests.includes(request.request_id)
 
                     return (
                       <Grid item xs={12} md={6} key={request.request_id}>
@@ -294,6 +273,7 @@ const DashboardPage = () => {
                 ) : (
                   <Typography>אין לך בקשות קניה פעילות.</Typography>
                 )}
+                {renderLoadMore("requests", buyRequests.length, totals.requests)}
               </Grid>
             )}
 
@@ -323,6 +303,7 @@ const DashboardPage = () => {
                 ) : (
                   <Typography>טרם רכשת כרטיסים.</Typography>
                 )}
+                {renderLoadMore("tickets", tickets.length, totals.tickets)}
               </Grid>
             )}
           </Box>
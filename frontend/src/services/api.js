@@ -17,6 +17,11 @@ api.interceptors.request.use(
     if (token) {
       config.headers['Authorization'] = `Bearer ${token}`;
     }
+    // Echo our last write so the next reads see it, whichever server answers
+    const lastWrite = sessionStorage.getItem('lastWrite');
+    if (lastWrite) {
+      config.headers['X-Last-Write'] = lastWrite;
+    }
     return config;
   },
   (error) => {
@@ -24,6 +29,15 @@ api.interceptors.request.use(
   }
 );
 
+// Remember when we last wrote (see X-Last-Write above)
+api.interceptors.response.use((response) => {
+  const lastWrite = response.headers['x-last-write'];
+  if (lastWrite) {
+    sessionStorage.setItem('lastWrite', lastWrite);
+  }
+  return response;
+});
+
 // Auth services
 export const register = (userData) => {
   return api.post('/users/', userData);
@@ -94,6 +108,12 @@ export const getUserTickets = (userId) => {
   return api.get(`/tickets/user/${userId}`)
 }
 
+// Everything the dashboard needs in one request.
+// params: limit plus purchased_skip / listings_skip / requests_skip for paging
+export const getUserDashboard = (userId, params = {}) => {
+  return api.get(`/users/${userId}/dashboard`, { params })
+}
+
 // Add this function to your api.js file
 export const updateListingStatus = (listingData) => {
   return api.put(`/sell-listings/status`, listingData)